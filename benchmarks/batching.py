@@ -0,0 +1,61 @@
+import os
+import sys
+import torch
+import argparse
+
+import numpy as np
+
+sys.path.append(os.getcwd())
+
+from benchmarks.common import synthetic_audio, timed
+from modules import fairseq
+from modules.config import Config
+from modules.pipeline import Pipeline
+
+def benchmark_batching(embedder_path, segments=6, min_seconds=3, max_seconds=15, version="v2", tolerance=1e-3, seed=0):
+    torch.manual_seed(0)
+    model = fairseq.load_model(embedder_path).eval().float()
+    pipeline = Pipeline(40000, Config(is_half=False, cpu_mode=True))
+
+    rng = np.random.RandomState(seed)
+    audio = synthetic_audio(max_seconds * segments, dtype=np.float64)
+    lengths = rng.randint(int(min_seconds * pipeline.sample_rate), int(max_seconds * pipeline.sample_rate), size=segments)
+    starts = [int(rng.randint(0, audio.shape[0] - length)) for length in lengths]
+    sources = [audio[start : start + length] for start, length in zip(starts, lengths)]
+
+    with torch.no_grad():
+        sequential, sequential_s = timed(lambda: [pipeline.extract_features(model, torch.from_numpy(source).float().view(1, -1), version)[0] for source in sources])
+        batched, batched_s = timed(lambda: pipeline.extract_features_batch(model, sources, version, [None] * len(sources)))
+
+    same_frames = all(a.shape == b.shape for a, b in zip(sequential, batched))
+    errors = [float(torch.abs(a - b).max()) for a, b in zip(sequential, batched)] if same_frames else [float("inf")]
+
+    results = {
+        "segments": segments,
+        "lengths_s": [float(length / pipeline.sample_rate) for length in lengths],
+        "sequential_s": sequential_s,
+        "batched_s": batched_s,
+        "speedup": sequential_s / max(batched_s, 1e-9),
+        "same_frames": same_frames,
+        "max_abs_error": max(errors)
+    }
+
+    for key, value in results.items():
+        print(f"[INFO] {key}: {value}")
+
+    passed = same_frames and results["max_abs_error"] <= tolerance
+    if not passed: print("[WARNING] Batched embedder features differ from the sequential path.")
+
+    return results, passed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--embedder_path", default=os.path.join("models", "contentvec_base.pt"))
+    parser.add_argument("--segments", type=int, default=6)
+    parser.add_argument("--min_seconds", type=float, default=3)
+    parser.add_argument("--max_seconds", type=float, default=15)
+    parser.add_argument("--version", default="v2")
+    parser.add_argument("--tolerance", type=float, default=1e-3)
+    args = parser.parse_args()
+
+    sys.exit(0 if benchmark_batching(args.embedder_path, args.segments, args.min_seconds, args.max_seconds, args.version, args.tolerance)[1] else 1)
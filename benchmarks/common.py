@@ -0,0 +1,48 @@
+import time
+
+import numpy as np
+
+synthesizer_config = [1025, 32, 192, 192, 768, 2, 6, 3, 0, "1", [3, 7, 11], [[1, 3, 5], [1, 3, 5], [1, 3, 5]], [10, 10, 2, 2], 512, [16, 16, 4, 4], 109, 256, 40000]
+
+def synthetic_audio(seconds, sample_rate=16000, seed=0, dtype=np.float32):
+    rng = np.random.RandomState(seed)
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+
+    f0 = 110 + 90 * (0.5 + 0.5 * np.sin(2 * np.pi * 0.07 * t)) * (1 + 0.02 * np.sin(2 * np.pi * 5.5 * t))
+    phase = 2 * np.pi * np.cumsum(f0) / sample_rate
+    audio = sum(np.sin(k * phase) / k for k in range(1, 11))
+
+    syllables = np.clip(np.sin(2 * np.pi * 3.7 * t) + 0.3, 0, 1) * (np.sin(2 * np.pi * 0.3 * t) > -0.7)
+    audio = 0.3 * audio / np.abs(audio).max() * syllables + 0.005 * rng.randn(t.shape[0])
+
+    return audio.astype(dtype)
+
+def timed(func, repeats=1, warmup=False):
+    if warmup: func()
+    timings = []
+
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+
+    return result, float(np.median(timings))
+
+def cosine(a, b):
+    return float(np.mean(np.sum(a * b, -1) / (np.linalg.norm(a, axis=-1) * np.linalg.norm(b, axis=-1) + 1e-8)))
+
+def spectral_distance(a, b):
+    import torch
+
+    a, b = torch.from_numpy(a).float(), torch.from_numpy(b).float()
+    window = torch.hann_window(1024)
+    a, b = torch.stft(a, 1024, 256, window=window, return_complex=True).abs(), torch.stft(b, 1024, 256, window=window, return_complex=True).abs()
+
+    return float(torch.mean(torch.abs(torch.log(a + 1e-5) - torch.log(b + 1e-5))))
+
+def voicing_agreement(reference, f0):
+    return float(np.mean((reference > 0) == (f0 > 0))) if reference.shape[0] else 1.0
+
+def cents_error(reference, f0):
+    voiced = (reference > 0) & (f0 > 0)
+    return float(np.abs(1200 * np.log2(f0[voiced] / reference[voiced])).max()) if voiced.any() else 0.0
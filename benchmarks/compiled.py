@@ -0,0 +1,75 @@
+import os
+import sys
+import time
+import torch
+import argparse
+
+import numpy as np
+
+sys.path.append(os.getcwd())
+
+from benchmarks.common import synthesizer_config
+from modules import export
+from modules.compiled import CompiledSynthesizer, bucket
+
+def build(pth_path=None, vocoder="Default"):
+    if pth_path is None:
+        torch.manual_seed(0)
+        os.makedirs("cache", exist_ok=True)
+        pth_path = os.path.join("cache", f"random_{vocoder}.pth")
+
+        net_g = export.build_synthesizer(list(synthesizer_config), 1, "v2", vocoder, False)
+        torch.save({"weight": net_g.state_dict(), "config": synthesizer_config, "f0": 1, "version": "v2", "vocoder": vocoder}, pth_path)
+
+    return export.remove_parametrizations(export.load_checkpoint(pth_path)[0]).eval().float(), pth_path
+
+def inputs(net_g, frames):
+    phone = torch.randn(1, frames, net_g.enc_p.emb_phone.in_features)
+    pitchf = 150 + 50 * torch.sin(torch.linspace(0, 12, frames)).unsqueeze(0)
+    pitch = torch.clamp(torch.round(12 * torch.log2(pitchf / 10)), 1, 255).long()
+    energy = torch.full((1, frames), 0.1) if net_g.enc_p.emb_energy is not None else None
+
+    return phone, torch.LongTensor([frames]), pitch if net_g.use_f0 else None, pitchf if net_g.use_f0 else None, torch.LongTensor([0]), energy
+
+def run(synthesizer, args):
+    start = time.perf_counter()
+    with torch.no_grad():
+        synthesizer.infer(*args)
+
+    return time.perf_counter() - start
+
+def benchmark_compiled(pth_path=None, vocoder="Default", lengths=(300, 517, 1000, 1400), modes=("jit", "inductor"), repeats=5):
+    net_g, pth_path = build(pth_path, vocoder)
+    cases = {frames: inputs(net_g, frames) for frames in lengths}
+    results = {"buckets": {frames: bucket(frames) for frames in lengths}}
+
+    eager = {frames: float(np.median([run(net_g, args) for _ in range(repeats)])) for frames, args in cases.items()}
+    results["eager"] = eager
+
+    for mode in modes:
+        try:
+            synthesizer = CompiledSynthesizer(net_g, pth_path, mode)
+            warmup = {frames: run(synthesizer, args) for frames, args in cases.items()}
+            steady = {frames: float(np.median([run(synthesizer, args) for _ in range(repeats)])) for frames, args in cases.items()}
+            cached = {frames: run(CompiledSynthesizer(net_g, pth_path, mode), args) for frames, args in list(cases.items())[:1]}
+        except Exception as e:
+            print(f"[WARNING] {mode} failed: {e}")
+            continue
+
+        results[mode] = {"warmup": warmup, "steady": steady, "cached_warmup": cached, "speedup": {frames: eager[frames] / max(steady[frames], 1e-9) for frames in lengths}}
+
+    for name, value in results.items():
+        print(f"[INFO] {name}: {value}")
+
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pth_path", default=None)
+    parser.add_argument("--vocoder", default="Default", choices=["Default", "MRF-HiFi-GAN", "RefineGAN"])
+    parser.add_argument("--lengths", type=int, nargs="+", default=[300, 517, 1000, 1400])
+    parser.add_argument("--modes", nargs="+", default=["jit", "inductor"])
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    benchmark_compiled(args.pth_path, args.vocoder, args.lengths, args.modes, args.repeats)
@@ -0,0 +1,69 @@
+import os
+import sys
+import json
+import torch
+import argparse
+import resource
+import subprocess
+
+import numpy as np
+
+sys.path.append(os.getcwd())
+
+from benchmarks.common import synthetic_audio, cosine
+
+def measure(embedder_path, seconds, chunk, version="v2", output=None):
+    from modules import fairseq
+    from modules.config import Config
+    from modules.pipeline import Pipeline
+
+    torch.manual_seed(0)
+    model = fairseq.load_model(embedder_path).eval().float()
+    pipeline = Pipeline(40000, Config(is_half=False, cpu_mode=True))
+
+    audio = synthetic_audio(seconds)
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    with torch.no_grad():
+        feats = pipeline.extract_features(model, torch.from_numpy(audio).view(1, -1), version, chunk=chunk)
+
+    if output: np.save(output, feats.cpu().numpy())
+    return {"seconds": seconds, "chunk": chunk, "frames": feats.shape[1], "peak_rss_mb": (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline) / 1024}
+
+def benchmark_embedding(embedder_path, lengths=(10, 30, 60, 120), chunk=10, version="v2", compare_up_to=60):
+    results = []
+
+    for seconds in lengths:
+        row = {"seconds": seconds}
+
+        for name, value in (("full", 0), ("chunked", chunk)):
+            if name == "full" and seconds > compare_up_to: continue
+            output = os.path.join("cache", f"embedding_{name}_{seconds}.npy")
+            os.makedirs("cache", exist_ok=True)
+
+            process = subprocess.run([sys.executable, __file__, "--measure", "--embedder_path", embedder_path, "--seconds", str(seconds), "--chunk", str(value), "--version", version, "--output", output], capture_output=True, text=True, check=True)
+            row[name] = json.loads(process.stdout.strip().splitlines()[-1])
+
+        if "full" in row:
+            full, chunked = np.load(os.path.join("cache", f"embedding_full_{seconds}.npy"))[0], np.load(os.path.join("cache", f"embedding_chunked_{seconds}.npy"))[0]
+            row["max_abs_error"] = float(np.abs(full - chunked).max())
+            row["mean_cosine"] = cosine(full, chunked)
+
+        print(f"[INFO] {json.dumps(row)}")
+        results.append(row)
+
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--embedder_path", default=os.path.join("models", "contentvec_base.pt"))
+    parser.add_argument("--lengths", type=float, nargs="+", default=[10, 30, 60, 120])
+    parser.add_argument("--chunk", type=float, default=10)
+    parser.add_argument("--version", default="v2")
+    parser.add_argument("--measure", action="store_true")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    if args.measure: print(json.dumps(measure(args.embedder_path, args.seconds, args.chunk, args.version, args.output)))
+    else: benchmark_embedding(args.embedder_path, args.lengths, args.chunk, args.version)
\ No newline at end of file
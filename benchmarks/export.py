@@ -0,0 +1,65 @@
+import os
+import sys
+import torch
+import argparse
+
+import numpy as np
+
+sys.path.append(os.getcwd())
+
+from benchmarks.common import timed
+from modules import export
+
+def load_original(pth_path):
+    return export.load_checkpoint(pth_path)[0].eval().float()
+
+def load_exported(path):
+    return export.load_model(path)[0].float()
+
+def infer(net_g, seconds, seed=0):
+    frames = int(seconds * 100)
+    generator = torch.Generator().manual_seed(seed)
+    phone = torch.randn(1, frames, net_g.enc_p.emb_phone.in_features, generator=generator)
+    pitchf = 150 + 50 * torch.sin(torch.linspace(0, 12, frames)).unsqueeze(0)
+    pitch = torch.clamp(torch.round(12 * torch.log2(pitchf / 10)), 1, 255).long()
+
+    torch.manual_seed(seed)
+    with torch.no_grad():
+        return net_g.infer(phone, torch.LongTensor([frames]), pitch if net_g.use_f0 else None, pitchf if net_g.use_f0 else None, torch.LongTensor([0]), torch.full((1, frames), 0.1) if net_g.enc_p.emb_energy is not None else None)[0][0, 0].numpy()
+
+def benchmark_export(pth_path, dtype="float32", seconds=10, repeats=5):
+    output = os.path.join("cache", os.path.splitext(os.path.basename(pth_path))[0] + f"_{dtype}.safetensors")
+    os.makedirs("cache", exist_ok=True)
+    export.export_model(pth_path, output, dtype)
+
+    original, original_load = timed(lambda: load_original(pth_path), repeats)
+    exported, exported_load = timed(lambda: load_exported(output), repeats)
+
+    infer(original, 1); infer(exported, 1)
+    reference, original_infer = timed(lambda: infer(original, seconds), repeats)
+    result, exported_infer = timed(lambda: infer(exported, seconds), repeats)
+
+    results = {
+        "pth_mb": os.path.getsize(pth_path) / 1024**2,
+        "exported_mb": os.path.getsize(output) / 1024**2,
+        "original_load_s": original_load,
+        "exported_load_s": exported_load,
+        "original_infer_s": original_infer,
+        "exported_infer_s": exported_infer,
+        "max_abs_error": float(np.abs(reference - result).max())
+    }
+
+    for key, value in results.items():
+        print(f"[INFO] {key}: {value:.4f}")
+
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pth_path", required=True)
+    parser.add_argument("--dtype", default="float32", choices=["float32", "float16", "bfloat16"])
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    benchmark_export(args.pth_path, args.dtype, args.seconds, args.repeats)
@@ -0,0 +1,50 @@
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+sys.path.append(os.getcwd())
+
+targets = ["modules.generator", "modules.pipeline", "modules.inference", "modules.worker"]
+deferred = ["faiss", "parselmouth", "matplotlib.mlab", "librosa.core.pitch", "numba", "modules.swipe", "modules.torchcrepe", "modules.torchfcpe", "modules.rmvpe", "modules.pyworld"]
+
+def import_times(target):
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {target}"], capture_output=True, text=True, cwd=os.getcwd())
+    if process.returncode != 0: raise RuntimeError((process.stderr.strip().splitlines() or ["unknown error"])[-1])
+
+    times = {}
+
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line or "self [us]" in line: continue
+
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative) / 1e6
+
+    return times
+
+def benchmark_importtime(targets=targets, top=10, repeats=3):
+    results = {}
+
+    for target in targets:
+        runs = [import_times(target) for _ in range(repeats)]
+        times = min(runs, key=lambda run: run.get(target, float("inf")))
+
+        results[target] = {
+            "cumulative_s": times.get(target),
+            "loaded_deferred": [name for name in deferred if name in times],
+            "heaviest": dict(sorted(((name, value) for name, value in times.items() if "." not in name and name != target.split(".")[0]), key=lambda item: -item[1])[:top])
+        }
+
+        print(f"[INFO] {target}: {json.dumps(results[target])}")
+
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--targets", nargs="+", default=targets)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    benchmark_importtime(args.targets, args.top, args.repeats)
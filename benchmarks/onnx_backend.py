@@ -0,0 +1,74 @@
+import os
+import sys
+import torch
+import argparse
+
+import numpy as np
+
+sys.path.append(os.getcwd())
+
+from benchmarks.common import synthetic_audio, timed, spectral_distance
+from modules import fairseq, onnx
+from modules.config import Config
+from modules.rmvpe import RMVPE
+from modules.inference import model_registry
+
+def report(name, reference, result, eager, runtime, seconds):
+    row = {"max_abs_error": float(np.abs(reference - result).max()), "eager_rtf": eager / seconds, "onnx_rtf": runtime / seconds, "speedup": eager / max(runtime, 1e-9)}
+    print(f"[INFO] {name}: " + ", ".join(f"{k}={v:.5f}" for k, v in row.items()))
+
+    return row
+
+def benchmark_onnx(pth_path=None, embedder_model="contentvec_base", seconds=10, repeats=3):
+    torch.manual_seed(0)
+    source = torch.from_numpy(synthetic_audio(seconds)).view(1, -1)
+    results = {}
+
+    model = fairseq.load_model(os.path.join("models", embedder_model + ".pt")).eval().float()
+    runtime = onnx.OnnxEmbedder(embedder_model, model)
+
+    with torch.no_grad():
+        for layer in (9, 12):
+            reference, eager = timed(lambda: model.extract_features(source=source, padding_mask=torch.zeros_like(source, dtype=torch.bool), output_layer=layer)[0].numpy(), repeats, warmup=True)
+            result, ort = timed(lambda: runtime.extract_features(source=source, output_layer=layer)[0].numpy(), repeats, warmup=True)
+            results[f"embedder_layer{layer}"] = report(f"embedder layer {layer}", reference, result, eager, ort, seconds)
+
+        rmvpe = RMVPE(os.path.join("models", "rmvpe.pt"), is_half=False, device="cpu")
+        mel = rmvpe.mel_extractor(source, center=True)
+        reference, eager = timed(lambda: rmvpe.mel2hidden(mel).numpy(), repeats, warmup=True)
+
+        onnx.load_rmvpe(rmvpe)
+        result, ort = timed(lambda: rmvpe.mel2hidden(mel).numpy(), repeats, warmup=True)
+        results["rmvpe"] = report("rmvpe", reference, result, eager, ort, seconds)
+
+        if pth_path:
+            net_g = model_registry.load(pth_path, Config(is_half=False, cpu_mode=True))["net_g"]
+            runtime = onnx.load_synthesizer(pth_path, net_g)
+            wrapper = onnx.SynthesizerWrapper(net_g).eval()
+
+            frames = int(seconds * 100)
+            phone = torch.randn(1, frames, net_g.enc_p.emb_phone.in_features)
+            pitchf = 150 + 50 * torch.sin(torch.linspace(0, 12, frames)).unsqueeze(0)
+            pitch = torch.clamp(torch.round(12 * torch.log2(pitchf / 10)), 1, 255).long()
+            energy = torch.full((1, frames), 0.1) if net_g.enc_p.emb_energy is not None else None
+            rnd = torch.randn(1, net_g.inter_channels, frames)
+            kwargs = {"pitch": pitch, "pitchf": pitchf, "energy": energy} if net_g.use_f0 else {"energy": energy}
+
+            reference, eager = timed(lambda: wrapper(phone, torch.LongTensor([frames]), torch.LongTensor([0]), rnd, **kwargs)[0, 0].numpy(), repeats, warmup=True)
+            result, ort = timed(lambda: runtime.module(phone, torch.LongTensor([frames]), torch.LongTensor([0]), rnd, **kwargs)[0, 0].numpy(), repeats, warmup=True)
+            results["synthesizer"] = report("synthesizer", reference, result, eager, ort, seconds)
+
+            results["synthesizer"]["spectral_distance"] = spectral_distance(reference, result)
+            print(f"[INFO] synthesizer spectral_distance={results['synthesizer']['spectral_distance']:.5f} (the NSF source draws its own noise, so sample-level error is not expected to be zero)")
+
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pth_path", default=None)
+    parser.add_argument("--embedder_model", default="contentvec_base")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    benchmark_onnx(args.pth_path, args.embedder_model, args.seconds, args.repeats)
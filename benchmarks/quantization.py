@@ -0,0 +1,74 @@
+import os
+import sys
+import copy
+import torch
+import argparse
+
+sys.path.append(os.getcwd())
+
+from benchmarks.common import synthetic_audio, timed, cosine, spectral_distance
+from modules import fairseq, export, quantization
+
+def infer(net_g, phone, pitch, pitchf, energy):
+    torch.manual_seed(0)
+    return net_g.infer(phone, torch.LongTensor([phone.shape[1]]), pitch, pitchf, torch.LongTensor([0]), energy)[0][0, 0].numpy()
+
+def benchmark_quantization(pth_path=None, embedder_model="contentvec_base", seconds=10, repeats=3, threads=0):
+    if threads > 0: torch.set_num_threads(threads)
+
+    source = torch.from_numpy(synthetic_audio(seconds)).view(1, -1)
+    padding_mask = torch.zeros_like(source, dtype=torch.bool)
+    results = {}
+
+    model = fairseq.load_model(os.path.join("models", embedder_model + ".pt")).eval().float()
+    quantized = quantization.quantize(copy.deepcopy(model))
+
+    with torch.no_grad():
+        for version, layer in (("v1", 9), ("v2", 12)):
+            def extract(m):
+                feats = m.extract_features(source=source, padding_mask=padding_mask, output_layer=layer)[0]
+                return (m.final_proj(feats) if version == "v1" else feats)[0].numpy()
+
+            reference, fp32 = timed(lambda: extract(model), repeats, warmup=True)
+            result, int8 = timed(lambda: extract(quantized), repeats, warmup=True)
+
+            results[f"embedder_{version}"] = {"cosine": cosine(reference, result), "fp32_s": fp32, "int8_s": int8, "speedup": fp32 / max(int8, 1e-9)}
+            print(f"[INFO] embedder {version}: " + ", ".join(f"{k}={v:.4f}" for k, v in results[f"embedder_{version}"].items()))
+
+        if pth_path:
+            net_g = export.remove_parametrizations(export.load_checkpoint(pth_path)[0]).eval().float()
+
+            quantized_g = copy.deepcopy(net_g)
+            quantized_g.enc_p = quantization.quantize(quantized_g.enc_p)
+
+            phone = torch.from_numpy(reference).unsqueeze(0) if reference.shape[-1] == net_g.enc_p.emb_phone.in_features else torch.randn(1, int(seconds * 50), net_g.enc_p.emb_phone.in_features)
+            phone = torch.nn.functional.interpolate(phone.permute(0, 2, 1), scale_factor=2).permute(0, 2, 1)
+            frames = phone.shape[1]
+
+            pitchf = (150 + 50 * torch.sin(torch.linspace(0, 12, frames)).unsqueeze(0)) if net_g.use_f0 else None
+            pitch = torch.clamp(torch.round(12 * torch.log2(pitchf / 10)), 1, 255).long() if net_g.use_f0 else None
+            energy = torch.full((1, frames), 0.1) if net_g.enc_p.emb_energy is not None else None
+
+            reference_m = net_g.enc_p(phone, pitch, torch.LongTensor([frames]), energy)[0][0].numpy()
+            result_m = quantized_g.enc_p(phone, pitch, torch.LongTensor([frames]), energy)[0][0].numpy()
+
+            reference, fp32 = timed(lambda: infer(net_g, phone, pitch, pitchf, energy), repeats, warmup=True)
+            result, int8 = timed(lambda: infer(quantized_g, phone, pitch, pitchf, energy), repeats, warmup=True)
+            _, enc_fp32 = timed(lambda: net_g.enc_p(phone, pitch, torch.LongTensor([frames]), energy), repeats, warmup=True)
+            _, enc_int8 = timed(lambda: quantized_g.enc_p(phone, pitch, torch.LongTensor([frames]), energy), repeats, warmup=True)
+
+            results["synthesizer"] = {"prior_cosine": cosine(reference_m.T, result_m.T), "spectral_distance": spectral_distance(reference, result), "enc_p_fp32_s": enc_fp32, "enc_p_int8_s": enc_int8, "fp32_s": fp32, "int8_s": int8, "speedup": fp32 / max(int8, 1e-9)}
+            print("[INFO] synthesizer: " + ", ".join(f"{k}={v:.4f}" for k, v in results["synthesizer"].items()))
+
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pth_path", default=None)
+    parser.add_argument("--embedder_model", default="contentvec_base")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--threads", type=int, default=0)
+    args = parser.parse_args()
+
+    benchmark_quantization(args.pth_path, args.embedder_model, args.seconds, args.repeats, args.threads)
@@ -0,0 +1,120 @@
+import os
+import sys
+import json
+import time
+import torch
+import argparse
+import resource
+import subprocess
+
+import numpy as np
+
+sys.path.append(os.getcwd())
+
+from benchmarks.common import synthetic_audio
+from modules.cache import cache_dir
+
+def model_path():
+    path = os.path.join("models", "rmvpe.pt")
+    if os.path.exists(path): return path
+
+    from modules.rmvpe import E2E
+
+    path = os.path.join(cache_dir, "benchmark", "rmvpe.pt")
+    if not os.path.exists(path):
+        print("[WARNING] models/rmvpe.pt not found, using randomly initialised weights.")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        torch.manual_seed(0)
+        torch.save(E2E(4, 1, (2, 2)).state_dict(), path)
+
+    return path
+
+def legacy_local_average_cents(salience, cents_mapping, thred=0.05):
+    center = np.argmax(salience, axis=1)
+    salience = np.pad(salience, ((0, 0), (4, 4)))
+    center += 4
+    todo_salience, todo_cents_mapping = [], []
+    starts = center - 4
+    ends = center + 5
+
+    for idx in range(salience.shape[0]):
+        todo_salience.append(salience[:, starts[idx] : ends[idx]][idx])
+        todo_cents_mapping.append(cents_mapping[starts[idx] : ends[idx]])
+
+    todo_salience = np.array(todo_salience)
+    devided = np.sum(todo_salience * np.array(todo_cents_mapping), 1) / np.sum(todo_salience, 1)
+    devided[np.max(salience, axis=1) <= thred] = 0
+
+    return devided
+
+def peak_memory(device):
+    return torch.cuda.max_memory_allocated() / 1024 ** 2 if str(device).startswith("cuda") else resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def measure(seconds, chunk_time, overlap_time, batch_size, device="cpu", output=None):
+    from modules.rmvpe import RMVPE
+
+    rmvpe = RMVPE(model_path(), is_half=False, device=device, chunk_time=chunk_time, overlap_time=overlap_time, batch_size=batch_size)
+    rmvpe.infer_from_audio(synthetic_audio(1))
+
+    audio = synthetic_audio(seconds)
+    baseline = peak_memory(device)
+
+    start = time.perf_counter()
+    mel = rmvpe.mel_extractor(torch.from_numpy(audio).to(device).unsqueeze(0), center=True)
+    hidden = rmvpe.mel2hidden(mel).squeeze(0).cpu().numpy()
+    elapsed = time.perf_counter() - start
+    memory = peak_memory(device) - baseline
+
+    start = time.perf_counter()
+    legacy = legacy_local_average_cents(hidden, rmvpe.cents_mapping, thred=0.03)
+    legacy_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    cents = rmvpe.to_local_average_cents(hidden, thred=0.03)
+    decode_s = time.perf_counter() - start
+
+    if output: np.save(output, cents)
+    return {"seconds": seconds, "chunk_time": chunk_time, "frames": hidden.shape[0], "hidden_s": elapsed, "peak_memory_mb": memory, "legacy_decode_s": legacy_s, "decode_s": decode_s, "decode_speedup": legacy_s / max(decode_s, 1e-9), "decoder_identical": bool(np.array_equal(legacy, cents))}
+
+def benchmark_rmvpe(seconds=600, chunk_time=30, overlap_time=0.5, batch_size=4, device="cpu", tolerance=10):
+    os.makedirs(os.path.join(cache_dir, "benchmark"), exist_ok=True)
+    results = {}
+
+    for name, value in (("full", 0), ("chunked", chunk_time)):
+        output = os.path.join(cache_dir, "benchmark", f"rmvpe_{name}_{seconds}.npy")
+        process = subprocess.run([sys.executable, __file__, "--measure", "--seconds", str(seconds), "--chunk_time", str(value), "--overlap_time", str(overlap_time), "--batch_size", str(batch_size), "--device", device, "--output", output], capture_output=True, text=True, check=True)
+
+        results[name] = json.loads(process.stdout.strip().splitlines()[-1])
+        results[name]["cents"] = np.load(output)
+
+    full, chunked = results["full"].pop("cents"), results["chunked"].pop("cents")
+    voiced = (full > 0) & (chunked > 0)
+    error = np.abs(full[voiced] - chunked[voiced]) if voiced.any() else np.zeros(1)
+
+    results["voicing_agreement"] = float(np.mean((full > 0) == (chunked > 0)))
+    results["p99_cents_error"] = float(np.percentile(error, 99))
+    results["max_cents_error"] = float(error.max())
+    results["memory_ratio"] = results["chunked"]["peak_memory_mb"] / max(results["full"]["peak_memory_mb"], 1e-9)
+
+    for key, value in results.items():
+        print(f"[INFO] {key}: {value}")
+
+    passed = results["full"]["decoder_identical"] and results["chunked"]["decoder_identical"] and results["voicing_agreement"] >= 0.99 and results["p99_cents_error"] <= tolerance
+    if not passed: print("[WARNING] RMVPE decoding or chunked inference differs from the full-length reference.")
+
+    return results, passed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--measure", action="store_true")
+    parser.add_argument("--seconds", type=float, default=600)
+    parser.add_argument("--chunk_time", type=float, default=30)
+    parser.add_argument("--overlap_time", type=float, default=0.5)
+    parser.add_argument("--batch_size", type=int, default=4)
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--tolerance", type=float, default=10)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    if args.measure: print(json.dumps(measure(args.seconds, args.chunk_time, args.overlap_time, args.batch_size, args.device, args.output)))
+    else: sys.exit(0 if benchmark_rmvpe(args.seconds, args.chunk_time, args.overlap_time, args.batch_size, args.device, args.tolerance)[1] else 1)
@@ -0,0 +1,67 @@
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+import soundfile as sf
+
+sys.path.append(os.getcwd())
+
+from modules.config import Config
+from modules.utils import load_audio
+from modules.inference import VoiceConverter
+from modules.streaming import StreamingVoiceConverter
+
+def benchmark_streaming(pth_path, input_path, output_path=None, embedder_model="contentvec_base", f0_method="rmvpe", index_path="", block_time=0.25, crossfade_time=0.05, extra_time=2.0, sola_search_time=0.01):
+    config = Config(is_half=False, cpu_mode=True)
+    cvt = VoiceConverter(config, pth_path, 0)
+    stream = StreamingVoiceConverter(cvt, embedder_model=embedder_model, f0_method=f0_method, index_path=index_path, block_time=block_time, crossfade_time=crossfade_time, extra_time=extra_time, sola_search_time=sola_search_time)
+
+    audio = load_audio(input_path, 16000)
+    block_size = stream.block_frames * stream.window
+    stream.process(np.zeros(block_size, dtype=np.float32))
+
+    timings, outputs = [], []
+
+    for start in range(0, audio.shape[0] - block_size + 1, block_size):
+        t0 = time.perf_counter()
+        outputs.append(stream.process(audio[start : start + block_size]))
+        timings.append(time.perf_counter() - t0)
+
+    timings = np.array(timings)
+    block_seconds = block_size / 16000
+
+    results = {
+        "blocks": len(timings), 
+        "block_ms": block_seconds * 1000, 
+        "algorithmic_latency_ms": stream.latency * 1000, 
+        "mean_ms": timings.mean() * 1000, 
+        "p50_ms": np.percentile(timings, 50) * 1000, 
+        "p95_ms": np.percentile(timings, 95) * 1000, 
+        "max_ms": timings.max() * 1000, 
+        "rtf": timings.sum() / (len(timings) * block_seconds), 
+        "realtime": bool(timings.max() < block_seconds)
+    }
+
+    for key, value in results.items():
+        print(f"[INFO] {key}: {value:.3f}" if isinstance(value, float) else f"[INFO] {key}: {value}")
+
+    if output_path: sf.write(output_path, np.concatenate(outputs), stream.tgt_sr)
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pth_path", required=True)
+    parser.add_argument("--input_path", required=True)
+    parser.add_argument("--output_path", default=None)
+    parser.add_argument("--index_path", default="")
+    parser.add_argument("--embedder_model", default="contentvec_base")
+    parser.add_argument("--f0_method", default="rmvpe")
+    parser.add_argument("--block_time", type=float, default=0.25)
+    parser.add_argument("--crossfade_time", type=float, default=0.05)
+    parser.add_argument("--extra_time", type=float, default=2.0)
+    parser.add_argument("--sola_search_time", type=float, default=0.01)
+    args = parser.parse_args()
+
+    benchmark_streaming(**vars(args))
\ No newline at end of file
@@ -0,0 +1,182 @@
+import os
+import sys
+import json
+import time
+import torch
+import argparse
+import platform
+import resource
+import subprocess
+
+import numpy as np
+
+os.environ.setdefault("RVC_FEATURE_CACHE_MB", "0")
+os.environ.setdefault("RVC_F0_CACHE_MB", "0")
+os.environ.setdefault("RVC_F0_MEMORY_CACHE_MB", "0")
+
+sys.path.append(os.getcwd())
+
+from benchmarks.common import synthetic_audio, synthesizer_config
+from modules import export, fairseq, tracing
+from modules.cache import cache_dir
+
+versions = ["v1", "v2"]
+vocoders = ["Default", "MRF-HiFi-GAN", "RefineGAN"]
+f0_methods = ["rmvpe", "fcpe", "pm", "harvest", "swipe", "yin"]
+lengths = [5, 60, 600]
+
+fcpe_config = {"mel": {"type": "default", "sr": 16000, "num_mels": 128, "n_fft": 1024, "win_size": 1024, "hop_size": 160, "fmin": 0, "fmax": 8000}, "model": {"out_dims": 360, "hidden_dims": 512, "n_layers": 6, "n_heads": 8, "f0_max": 1975.5, "f0_min": 32.70, "use_fa_norm": True, "conv_only": True, "conv_dropout": 0.0, "atten_dropout": 0.0}}
+
+def model_dir():
+    return os.path.join(cache_dir, "benchmark")
+
+def build_models(directory=None):
+    directory = directory or model_dir()
+    os.makedirs(directory, exist_ok=True)
+    torch.manual_seed(0)
+
+    for version in versions:
+        for vocoder in vocoders:
+            path = os.path.join(directory, f"synthesizer_{version}_{vocoder}.pth")
+            if os.path.exists(path): continue
+
+            net_g = export.build_synthesizer(list(synthesizer_config), 1, version, vocoder, False)
+            torch.save({"weight": net_g.state_dict(), "config": synthesizer_config, "f0": 1, "version": version, "vocoder": vocoder}, path)
+
+    path = os.path.join(directory, "hubert.pt")
+    if not os.path.exists(path):
+        cfg = fairseq.HubertConfig(_name="hubert", label_rate=50, encoder_layers_1=3, logit_temp_ctr=0.1, num_negatives=100, cross_sample_negatives=0, ctr_layers=[-6], final_dim=256)
+        torch.save({"cfg": {"model": vars(cfg)}, "model": fairseq.HubertModel(cfg).state_dict()}, path)
+
+    path = os.path.join(directory, "rmvpe.pt")
+    if not os.path.exists(path):
+        from modules.rmvpe import E2E
+        torch.save(E2E(4, 1, (2, 2)).state_dict(), path)
+
+    path = os.path.join(directory, "fcpe.pt")
+    if not os.path.exists(path):
+        from modules.torchfcpe import CFNaiveMelPE
+        model = CFNaiveMelPE(input_channels=fcpe_config["mel"]["num_mels"], **fcpe_config["model"])
+        torch.save({"config_dict": fcpe_config, "model": model.state_dict()}, path)
+
+    return directory
+
+def peak_rss():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 ** 2 if sys.platform == "darwin" else 1024)
+
+def measure(version, vocoder, f0_method, seconds, repeats=1, batch_size=1, embed_chunk=0, index_path="", threads=0, profile_memory=False):
+    from modules.config import Config
+    from modules.rmvpe import RMVPE
+    from modules.torchfcpe import FCPE
+    from modules.inference import VoiceConverter, model_registry
+    from modules.generator import predictor_pool
+
+    if threads > 0: torch.set_num_threads(threads)
+    directory = model_dir()
+
+    config = Config(is_half=False, cpu_mode=True)
+    model_registry.register_embedder("benchmark", fairseq.load_model(os.path.join(directory, "hubert.pt")).eval().float(), config)
+    cvt = VoiceConverter(config, os.path.join(directory, f"synthesizer_{version}_{vocoder}.pth"), 0)
+
+    generator = cvt.vc.f0_generator
+    if f0_method.startswith("rmvpe"): predictor_pool.put(generator.predictor_key("rmvpe"), RMVPE(os.path.join(directory, "rmvpe.pt"), is_half=False, device="cpu"))
+    if f0_method.startswith("fcpe"): predictor_pool.put(generator.predictor_key("fcpe"), FCPE(os.path.join(directory, "fcpe.pt"), hop_length=generator.hop_length, f0_min=generator.f0_min, f0_max=generator.f0_max, dtype=torch.float32, device="cpu", sample_rate=16000, threshold=0.006))
+
+    def convert(audio):
+        return cvt.convert_array(audio, index_path=index_path, embedder_model="benchmark", pitch=0, f0_method=f0_method, index_rate=0.5, volume_envelope=1, protect=0.5, hop_length=160, filter_radius=3, batch_size=batch_size, embed_chunk=embed_chunk)
+
+    with torch.no_grad():
+        convert(synthetic_audio(1))
+        model_rss = peak_rss()
+
+        tracer = tracing.enable(memory=profile_memory)
+        audio = synthetic_audio(seconds)
+        runs = []
+
+        for _ in range(repeats):
+            tracer.reset()
+            start = time.perf_counter()
+            convert(audio)
+            elapsed = time.perf_counter() - start
+            runs.append((elapsed, tracer.summary(elapsed)["stages"]))
+
+    elapsed, stages = min(runs, key=lambda run: run[0])
+    return {"version": version, "vocoder": vocoder, "f0_method": f0_method, "seconds": seconds, "elapsed": elapsed, "rtf": elapsed / seconds, "peak_rss_mb": peak_rss(), "model_rss_mb": model_rss, "stages": stages}
+
+def case_id(result):
+    return f"{result['version']}/{result['vocoder']}/{result['f0_method']}/{result['seconds']}s"
+
+def compare(results, baseline_path, tolerance=0.1):
+    with open(baseline_path, "r") as f:
+        baseline = {case_id(result): result for result in json.load(f)["results"] if "error" not in result}
+
+    regressions = []
+
+    for result in results:
+        reference = baseline.get(case_id(result))
+        if reference is None or "error" in result: continue
+
+        for metric in ("rtf", "peak_rss_mb"):
+            ratio = result[metric] / max(reference[metric], 1e-9)
+            result.setdefault("baseline", {})[metric] = {"value": reference[metric], "ratio": ratio}
+
+            if ratio > 1 + tolerance:
+                regressions.append((case_id(result), metric, ratio))
+                print(f"[WARNING] {case_id(result)}: {metric} regressed {reference[metric]:.3f} -> {result[metric]:.3f} ({100 * (ratio - 1):.1f}%)")
+
+    print(f"[INFO] Compared {sum('baseline' in result for result in results)} cases against {baseline_path}: {len(regressions)} regressions.")
+    return regressions
+
+def benchmark_suite(versions=versions, vocoders=vocoders, f0_methods=f0_methods, lengths=lengths, repeats=1, batch_size=1, embed_chunk=0, index_path="", threads=0, output=None, baseline=None, tolerance=0.1, profile_memory=False):
+    build_models()
+    results = []
+
+    for version in versions:
+        for vocoder in vocoders:
+            for f0_method in f0_methods:
+                for seconds in lengths:
+                    name = f"{version}/{vocoder}/{f0_method}/{seconds}s"
+                    process = subprocess.run([sys.executable, __file__, "--measure", "--versions", version, "--vocoders", vocoder, "--f0_methods", f0_method, "--lengths", str(seconds), "--repeats", str(repeats), "--batch_size", str(batch_size), "--embed_chunk", str(embed_chunk), "--index_path", index_path, "--threads", str(threads)] + (["--profile_memory"] if profile_memory else []), capture_output=True, text=True)
+
+                    try:
+                        result = json.loads(process.stdout.strip().splitlines()[-1])
+                    except (IndexError, ValueError):
+                        result = {"version": version, "vocoder": vocoder, "f0_method": f0_method, "seconds": seconds, "error": (process.stderr.strip().splitlines() or ["unknown error"])[-1]}
+                        print(f"[WARNING] {name} failed: {result['error']}")
+                    else:
+                        print(f"[INFO] {name}: rtf {result['rtf']:.3f}, peak rss {result['peak_rss_mb']:.0f} MB, " + ", ".join(f"{stage} {value['seconds']:.2f}s" for stage, value in list(result["stages"].items())[:5]))
+
+                    results.append(result)
+
+    regressions = compare(results, baseline, tolerance) if baseline else []
+    report = {"created": time.strftime("%Y-%m-%d %H:%M:%S"), "platform": platform.platform(), "python": platform.python_version(), "torch": torch.__version__, "numpy": np.__version__, "threads": threads or torch.get_num_threads(), "batch_size": batch_size, "embed_chunk": embed_chunk, "results": results}
+
+    output = output or os.path.join(model_dir(), f"suite_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"[INFO] Results written to {output}")
+    return report, regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--measure", action="store_true")
+    parser.add_argument("--versions", nargs="+", default=versions, choices=versions)
+    parser.add_argument("--vocoders", nargs="+", default=vocoders, choices=vocoders)
+    parser.add_argument("--f0_methods", nargs="+", default=f0_methods)
+    parser.add_argument("--lengths", type=int, nargs="+", default=lengths)
+    parser.add_argument("--repeats", type=int, default=1)
+    parser.add_argument("--batch_size", type=int, default=1)
+    parser.add_argument("--embed_chunk", type=float, default=0)
+    parser.add_argument("--index_path", default="")
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--baseline", default=None)
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    parser.add_argument("--profile_memory", action="store_true")
+    args = parser.parse_args()
+
+    if args.measure: print(json.dumps(measure(args.versions[0], args.vocoders[0], args.f0_methods[0], args.lengths[0], args.repeats, args.batch_size, args.embed_chunk, args.index_path, args.threads, args.profile_memory)))
+    else: sys.exit(1 if benchmark_suite(args.versions, args.vocoders, args.f0_methods, args.lengths, args.repeats, args.batch_size, args.embed_chunk, args.index_path, args.threads, args.output, args.baseline, args.tolerance, args.profile_memory)[1] else 0)
@@ -0,0 +1,92 @@
+import os
+import sys
+import time
+import torch
+import librosa
+import argparse
+import scipy.stats
+
+import numpy as np
+
+sys.path.append(os.getcwd())
+
+from modules.torchcrepe import CENTS_PER_BIN, PITCH_BINS, CREPE, transition_matrix, viterbi
+
+def synthetic_probs(seconds, batch=1, f0_min=50, f0_max=1100, seed=0):
+    rng = np.random.RandomState(seed)
+    n_steps = int(seconds * 100)
+
+    t = np.arange(n_steps) / 100
+    center = 160 + 60 * np.sin(2 * np.pi * 0.05 * t)[None] + 25 * np.sin(2 * np.pi * (0.3 + 0.1 * np.arange(batch))[:, None] * t[None])
+    voiced = np.sin(2 * np.pi * 0.4 * t + np.arange(batch)[:, None]) > -0.6
+
+    logits = -0.5 * ((np.arange(PITCH_BINS)[None, :, None] - center[:, None, :]) / 3) ** 2 + rng.randn(batch, PITCH_BINS, n_steps)
+    logits = np.where(voiced[:, None, :], logits, rng.randn(batch, PITCH_BINS, n_steps))
+
+    logits = torch.from_numpy(logits.astype(np.float32))
+    logits[:, : int(((1200 * np.log2(f0_min / 10)) - 1997.3794084376191) / CENTS_PER_BIN)] = -float("inf")
+    logits[:, int(np.ceil(((1200 * np.log2(f0_max / 10)) - 1997.3794084376191) / CENTS_PER_BIN)) :] = -float("inf")
+
+    return torch.nn.functional.softmax(logits, dim=1)
+
+def synchronize(device):
+    if str(device).startswith("cuda"): torch.cuda.synchronize()
+
+def benchmark_viterbi(seconds=600, batch=1, device="cpu", repeats=1, threads=0):
+    if threads > 0: torch.set_num_threads(threads)
+
+    probs = synthetic_probs(seconds, batch)
+    transition = transition_matrix()
+
+    start = time.perf_counter()
+    reference = np.array([librosa.sequence.viterbi(sequence, transition).astype(np.int64) for sequence in probs.numpy()])
+    librosa_s = time.perf_counter() - start
+
+    probs = probs.to(device)
+    viterbi(probs[:, :, :100])
+    timings = []
+
+    for _ in range(repeats):
+        synchronize(device)
+        start = time.perf_counter()
+        bins = viterbi(probs)
+        synchronize(device)
+        timings.append(time.perf_counter() - start)
+
+    bins = bins.cpu().numpy()
+    mismatches = int((bins != reference).sum())
+
+    crepe = CREPE.__new__(CREPE)
+    dither = (crepe.bins_to_frequency(torch.zeros(1000000, device=device)).cpu().double().log2() * 1200 - 1997.3794084376191 - 1200 * np.log2(10)).numpy()
+    triang = scipy.stats.triang(c=0.5, loc=-CENTS_PER_BIN, scale=2 * CENTS_PER_BIN)
+
+    results = {
+        "frames": probs.shape[-1],
+        "batch": batch,
+        "librosa_s": librosa_s,
+        "banded_s": min(timings),
+        "speedup": librosa_s / max(min(timings), 1e-9),
+        "identical": mismatches == 0,
+        "mismatched_frames": mismatches,
+        "dither_mean": float(dither.mean()),
+        "dither_std": float(dither.std()),
+        "triang_std": float(triang.std()),
+        "dither_ks": float(scipy.stats.kstest(dither, triang.cdf).statistic)
+    }
+
+    for key, value in results.items():
+        print(f"[INFO] {key}: {value:.4f}" if isinstance(value, float) else f"[INFO] {key}: {value}")
+
+    if mismatches: print(f"[WARNING] Banded Viterbi path differs from librosa on {mismatches} frames.")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=600)
+    parser.add_argument("--batch", type=int, default=1)
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--repeats", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=0)
+    args = parser.parse_args()
+
+    sys.exit(0 if benchmark_viterbi(args.seconds, args.batch, args.device, args.repeats, args.threads)["identical"] else 1)
@@ -0,0 +1,63 @@
+import os
+import sys
+import ctypes
+import argparse
+
+import numpy as np
+
+sys.path.append(os.getcwd())
+
+from benchmarks.common import synthetic_audio, timed, voicing_agreement, cents_error
+from modules.pyworld import PYWORLD
+
+def benchmark_world(seconds=300, segment_time=30, overlap_time=1, workers=0, methods=("harvest", "dio"), frame_period=10):
+    pw = PYWORLD()
+    x = synthetic_audio(seconds, dtype=np.float64)
+    workers = workers or pw.workers
+    results = {}
+
+    _, results["ctypes_unpack_s"] = timed(lambda: (ctypes.c_double * len(x))(*x))
+
+    for method in methods:
+        func = getattr(pw, method)
+
+        (reference, tpos), serial = timed(lambda: func(x, fs=16000, f0_floor=50, f0_ceil=1100, frame_period=frame_period, segment_time=0))
+        (f0, _), parallel = timed(lambda: func(x, fs=16000, f0_floor=50, f0_ceil=1100, frame_period=frame_period, segment_time=segment_time, workers=workers))
+        _, stonemask = timed(lambda: pw.stonemask(x, 16000, tpos, reference))
+
+        length = min(reference.shape[0], f0.shape[0])
+        step, overlap = max(int(segment_time * 1000 / frame_period), 1), int(np.ceil(overlap_time * 1000 / frame_period))
+
+        seams = np.zeros(length, dtype=bool)
+        for cut in range(step, length, step):
+            seams[max(cut - overlap, 0) : cut + overlap] = True
+
+        results[method] = {
+            "frames": reference.shape[0],
+            "serial_s": serial,
+            "segmented_s": parallel,
+            "speedup": serial / max(parallel, 1e-9),
+            "stonemask_s": stonemask,
+            "same_length": reference.shape[0] == f0.shape[0],
+            "voicing_agreement": voicing_agreement(reference[:length], f0[:length]),
+            "max_cents_error": cents_error(reference[:length], f0[:length]),
+            "seam_frames": int(seams.sum()),
+            "seam_voicing_agreement": voicing_agreement(reference[:length][seams], f0[:length][seams]),
+            "seam_max_cents_error": cents_error(reference[:length][seams], f0[:length][seams])
+        }
+
+    for key, value in results.items():
+        print(f"[INFO] {key}: {value}")
+
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=300)
+    parser.add_argument("--segment_time", type=float, default=30)
+    parser.add_argument("--overlap_time", type=float, default=1)
+    parser.add_argument("--workers", type=int, default=0)
+    parser.add_argument("--methods", nargs="+", default=["harvest", "dio"])
+    args = parser.parse_args()
+
+    benchmark_world(args.seconds, args.segment_time, args.overlap_time, args.workers, args.methods)
@@ -0,0 +1,310 @@
+import os
+import sys
+import hashlib
+import threading
+
+import numpy as np
+
+from collections import OrderedDict
+
+sys.path.append(os.getcwd())
+
+def file_key(path):
+    path = os.path.realpath(path)
+    stat = os.stat(path)
+
+    return path, stat.st_mtime_ns, stat.st_size
+
+def file_digest(path, block_size=1048576):
+    h = hashlib.blake2b(digest_size=20)
+
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+
+    return h.hexdigest()
+
+def cache_key(*parts):
+    h = hashlib.blake2b(digest_size=20)
+
+    for part in parts:
+        h.update(np.ascontiguousarray(part).view(np.uint8).tobytes() if isinstance(part, np.ndarray) else repr(part).encode("utf-8"))
+        h.update(b"\x00")
+
+    return h.hexdigest()
+
+def feature_path(file_index):
+    return os.path.splitext(file_index)[0] + "_features.npy"
+
+def convert_index(file_index, half=False):
+    import faiss
+
+    index = faiss.read_index(file_index)
+    output = feature_path(file_index)
+
+    with open(output + ".tmp", "wb") as f:
+        np.save(f, index.reconstruct_n(0, index.ntotal).astype(np.float16 if half else np.float32))
+
+    os.replace(output + ".tmp", output)
+    index_cache.invalidate(file_index)
+
+    return output
+
+class LRUCache:
+    def __init__(self, max_bytes=None, max_items=None):
+        self.max_bytes = max_bytes
+        self.max_items = max_items
+        self.items = OrderedDict()
+        self.sizes = {}
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.RLock()
+
+    def __contains__(self, key):
+        with self.lock:
+            return key in self.items
+
+    def __len__(self):
+        with self.lock:
+            return len(self.items)
+
+    def get(self, key, default=None):
+        with self.lock:
+            if key not in self.items:
+                self.misses += 1
+                return default
+
+            self.hits += 1
+            self.items.move_to_end(key)
+            return self.items[key]
+
+    def put(self, key, value, size=0):
+        with self.lock:
+            if key in self.items: self.pop(key)
+            if self.max_bytes is not None and size > self.max_bytes: return value
+
+            self.items[key] = value
+            self.sizes[key] = size
+            self.nbytes += size
+            self.evict()
+
+            return value
+
+    def pop(self, key, default=None):
+        with self.lock:
+            if key not in self.items: return default
+
+            self.nbytes -= self.sizes.pop(key)
+            return self.items.pop(key)
+
+    def evict(self):
+        with self.lock:
+            while self.items and ((self.max_bytes is not None and self.nbytes > self.max_bytes) or (self.max_items is not None and len(self.items) > self.max_items)):
+                self.pop(next(iter(self.items)))
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+            self.sizes.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        with self.lock:
+            return {"items": len(self.items), "bytes": self.nbytes, "hits": self.hits, "misses": self.misses}
+
+class DiskCache:
+    def __init__(self, path, max_bytes=None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.nbytes = None
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.RLock()
+
+    @property
+    def enabled(self):
+        return self.max_bytes is None or self.max_bytes > 0
+
+    def key(self, *parts):
+        return cache_key(*parts)
+
+    def file(self, key):
+        return os.path.join(self.path, key[:2], key + ".npy")
+
+    def get(self, key, mmap_mode="r"):
+        if not self.enabled: return None
+        file = self.file(key)
+
+        try:
+            value = np.load(file, mmap_mode=mmap_mode)
+            os.utime(file)
+        except (OSError, ValueError):
+            with self.lock:
+                self.misses += 1
+            return None
+
+        with self.lock:
+            self.hits += 1
+        return value
+
+    def put(self, key, value):
+        if not self.enabled: return value
+        file = self.file(key)
+
+        try:
+            os.makedirs(os.path.dirname(file), exist_ok=True)
+            with open(file + f".{os.getpid()}.tmp", "wb") as f:
+                np.save(f, np.ascontiguousarray(value))
+
+            previous = os.path.getsize(file) if os.path.exists(file) else 0
+            os.replace(file + f".{os.getpid()}.tmp", file)
+            size = os.path.getsize(file)
+        except OSError as e:
+            print(f"[WARNING] Could not write cache file {file}: {e}")
+            return value
+
+        with self.lock:
+            if self.nbytes is None: self.nbytes = sum(size for _, size, _ in self.entries())
+            else: self.nbytes += size - previous
+
+            if self.max_bytes is not None and self.nbytes > self.max_bytes: self.evict()
+
+        return value
+
+    def entries(self):
+        entries = []
+
+        for root, _, files in os.walk(self.path):
+            for name in files:
+                if not name.endswith(".npy"): continue
+
+                try:
+                    stat = os.stat(os.path.join(root, name))
+                except OSError:
+                    continue
+
+                entries.append((stat.st_mtime, stat.st_size, os.path.join(root, name)))
+
+        return sorted(entries)
+
+    def evict(self):
+        if self.max_bytes is None: return
+
+        with self.lock:
+            entries = self.entries()
+            nbytes = sum(size for _, size, _ in entries)
+
+            for _, size, file in entries:
+                if nbytes <= self.max_bytes: break
+
+                try:
+                    os.remove(file)
+                    nbytes -= size
+                except OSError:
+                    pass
+
+            self.nbytes = nbytes
+
+    def clear(self):
+        with self.lock:
+            for _, _, file in self.entries():
+                try:
+                    os.remove(file)
+                except OSError:
+                    pass
+
+            self.nbytes = None
+
+    def stats(self):
+        entries = self.entries()
+        return {"items": len(entries), "bytes": sum(size for _, size, _ in entries), "hits": self.hits, "misses": self.misses}
+
+class TieredCache:
+    def __init__(self, path, max_bytes=None, max_memory_bytes=None):
+        self.memory = LRUCache(max_bytes=max_memory_bytes)
+        self.disk = DiskCache(path, max_bytes=max_bytes)
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.RLock()
+
+    def key(self, *parts):
+        return cache_key(*parts)
+
+    def get(self, key):
+        value = self.memory.get(key)
+
+        if value is None:
+            value = self.disk.get(key, mmap_mode=None)
+            if value is not None: self.memory.put(key, value, size=value.nbytes)
+
+        with self.lock:
+            if value is None: self.misses += 1
+            else: self.hits += 1
+
+        return value
+
+    def put(self, key, value):
+        value = np.asarray(value)
+        self.memory.put(key, value, size=value.nbytes)
+        self.disk.put(key, value)
+
+        return value
+
+    def clear(self):
+        self.memory.clear()
+        self.disk.clear()
+
+    def stats(self):
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / max(self.hits + self.misses, 1), "memory": self.memory.stats(), "disk": self.disk.stats()}
+
+class IndexCache(LRUCache):
+    def __init__(self, max_bytes=None, max_items=None, mmap=False):
+        super().__init__(max_bytes, max_items)
+        self.mmap = mmap
+
+    def load(self, file_index):
+        key = file_key(file_index)
+
+        with self.lock:
+            cached = self.get(key)
+            if cached is not None: return cached
+
+            self.invalidate(key[0])
+            sidecar = feature_path(key[0])
+            if self.mmap and not self.is_fresh(sidecar, key):
+                try:
+                    convert_index(key[0])
+                except OSError as e:
+                    print(f"[WARNING] Could not write index features to {sidecar}: {e}")
+
+            import faiss
+
+            index = faiss.read_index(key[0])
+            big_npy = np.load(sidecar, mmap_mode="r") if self.is_fresh(sidecar, key) else None
+
+            if big_npy is None or big_npy.shape[0] != index.ntotal:
+                big_npy = index.reconstruct_n(0, index.ntotal)
+                size = big_npy.nbytes * 2
+            else: size = index.ntotal * index.d * 4
+
+            return self.put(key, (index, big_npy), size=size)
+
+    def is_fresh(self, sidecar, key):
+        return os.path.exists(sidecar) and os.stat(sidecar).st_mtime_ns >= key[1]
+
+    def invalidate(self, file_index=None):
+        with self.lock:
+            if file_index is None: return self.clear()
+            file_index = os.path.realpath(file_index)
+
+            for key in [key for key in self.items if key[0] == file_index]:
+                self.pop(key)
+
+index_cache = IndexCache(max_bytes=int(float(os.environ.get("RVC_INDEX_CACHE_MB", 2048)) * 1024**2), mmap=os.environ.get("RVC_INDEX_MMAP", "0") == "1")
+
+cache_dir = os.environ.get("RVC_CACHE_DIR", "cache")
+feature_cache = DiskCache(os.path.join(cache_dir, "features"), max_bytes=int(float(os.environ.get("RVC_FEATURE_CACHE_MB", 0)) * 1024**2))
+audio_cache = DiskCache(os.path.join(cache_dir, "audio"), max_bytes=int(float(os.environ.get("RVC_AUDIO_CACHE_MB", 0)) * 1024**2))
+f0_cache = TieredCache(os.path.join(cache_dir, "f0"), max_bytes=int(float(os.environ.get("RVC_F0_CACHE_MB", 256)) * 1024**2), max_memory_bytes=int(float(os.environ.get("RVC_F0_MEMORY_CACHE_MB", 64)) * 1024**2))
\ No newline at end of file
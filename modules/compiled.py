@@ -0,0 +1,91 @@
+import os
+import sys
+import math
+import torch
+
+import torch.nn.functional as F
+
+sys.path.append(os.getcwd())
+
+from modules.cache import cache_dir, cache_key, file_key
+
+def bucket(length, minimum=128, multiple=32):
+    if length <= minimum: return minimum
+    return multiple * math.ceil(minimum * 2 ** (math.ceil(2 * math.log2(length / minimum)) / 2) / multiple)
+
+class InferWrapper(torch.nn.Module):
+    def __init__(self, net_g, use_f0, use_energy):
+        super().__init__()
+        self.net_g = net_g
+        self.use_f0 = use_f0
+        self.use_energy = use_energy
+
+    def forward(self, phone, phone_lengths, sid, *extra):
+        extra = list(extra)
+        pitch, pitchf = (extra.pop(0), extra.pop(0)) if self.use_f0 else (None, None)
+        energy = extra.pop(0) if self.use_energy else None
+
+        return self.net_g.infer(phone, phone_lengths, pitch, pitchf, sid, energy)[0]
+
+class CompiledSynthesizer:
+    def __init__(self, net_g, model_path, mode="jit", minimum=128):
+        self.net_g = net_g
+        self.mode = mode
+        self.minimum = minimum
+        self.source = file_key(model_path)
+        self.use_f0 = net_g.use_f0
+        self.emb_g = net_g.emb_g
+        self.modules = {}
+
+        if mode == "inductor":
+            os.environ.setdefault("TORCHINDUCTOR_CACHE_DIR", os.path.join(cache_dir, "inductor"))
+            import torch._inductor.config as inductor_config
+            inductor_config.fx_graph_cache = True
+
+    def path(self, key):
+        return os.path.join(cache_dir, "compiled", cache_key(self.source, self.mode, key, torch.__version__) + ".pt")
+
+    def module(self, inputs, use_f0, use_energy):
+        key = (use_f0, use_energy, str(inputs[0].dtype), str(inputs[0].device), inputs[0].shape[0], inputs[0].shape[1])
+        if key in self.modules: return self.modules[key]
+
+        wrapper = InferWrapper(self.net_g, use_f0, use_energy).eval()
+
+        if self.mode == "inductor": module = torch.compile(wrapper, dynamic=False)
+        else:
+            path = self.path(key)
+
+            try:
+                module = torch.jit.load(path, map_location=inputs[0].device) if os.path.exists(path) else None
+            except Exception as e:
+                print(f"[WARNING] Could not load compiled synthesizer {path}: {e}")
+                module = None
+
+            if module is None:
+                with torch.no_grad():
+                    module = torch.jit.freeze(torch.jit.trace(wrapper, tuple(inputs), check_trace=False))
+
+                try:
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    torch.jit.save(module, path + f".{os.getpid()}.tmp")
+                    os.replace(path + f".{os.getpid()}.tmp", path)
+                except Exception as e:
+                    print(f"[WARNING] Could not write compiled synthesizer {path}: {e}")
+
+        self.modules[key] = module
+        return module
+
+    def infer(self, phone, phone_lengths, pitch=None, nsff0=None, sid=None, energy=None, rate=None):
+        if rate is not None: return self.net_g.infer(phone, phone_lengths, pitch, nsff0, sid, energy, rate)
+
+        length = phone.shape[1]
+        pad = bucket(length, self.minimum) - length
+
+        inputs = [F.pad(phone, (0, 0, 0, pad)), phone_lengths.view(-1), sid.view(-1)]
+        if pitch is not None: inputs += [F.pad(pitch, (0, pad)), F.pad(nsff0, (0, pad))]
+        if energy is not None: inputs.append(F.pad(energy, (0, pad)))
+
+        with torch.no_grad():
+            o = self.module(inputs, pitch is not None, energy is not None)(*inputs)
+
+        return o[..., : o.shape[-1] * length // inputs[0].shape[1]], None, None
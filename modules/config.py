@@ -1,30 +1,55 @@
 import os
 import sys
 import torch
+import inspect
 
 sys.path.append(os.getcwd())
 
 from modules import opencl
 
 def singleton(cls):
-    instances = {}
+    instances, arguments = {}, {}
+    signature = inspect.signature(cls)
 
     def get_instance(*args, **kwargs):
-        if cls not in instances: instances[cls] = cls(*args, **kwargs)
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+
+        if cls not in instances:
+            instances[cls] = cls(*args, **kwargs)
+            arguments[cls] = dict(bound.arguments)
+        else:
+            mismatched = [f"{name}={value!r} (existing {arguments[cls][name]!r})" for name, value in bound.arguments.items() if arguments[cls][name] != value]
+            if mismatched: raise ValueError(f"[ERROR] {cls.__name__} already exists with different settings: {', '.join(mismatched)}. Restart the process to change them.")
+
         return instances[cls]
 
     return get_instance
 
 @singleton
 class Config:
-    def __init__(self, cpu_mode=False, is_half=False):
+    def __init__(self, cpu_mode=False, is_half=False, backend="torch", quantize=None, compile_mode=None):
         self.device = "cuda:0" if torch.cuda.is_available() else ("ocl:0" if opencl.is_available() else "cpu")
         self.is_half = is_half
         self.gpu_mem = None
         self.cpu_mode = cpu_mode
-        if cpu_mode: self.device = "cpu"
+        self.backend = backend
+        if backend == "onnx": self.cpu_mode, self.is_half = True, False
+        if self.cpu_mode: self.device = "cpu"
+
+        if quantize not in (None, "int8"): raise ValueError(f"[ERROR] Unsupported quantization: {quantize}")
+
+        self.quantize = quantize if backend == "torch" else None
+        if self.quantize is not None and self.device != "cpu":
+            print(f"[WARNING] Dynamic {quantize} quantization only runs on cpu, ignoring it on {self.device}.")
+            self.quantize = None
+
+        if self.quantize is not None: self.is_half = False
+
+        if compile_mode not in (None, "jit", "inductor"): raise ValueError(f"[ERROR] Unsupported compile mode: {compile_mode}")
+        self.compile_mode = compile_mode if backend == "torch" else None
 
-    def device_config(self):
+    def device_config(self, is_half=None):
         if not self.cpu_mode:
             if self.device.startswith("cuda"): self.set_cuda_config()
             elif opencl.is_available(): self.device = "ocl:0"
@@ -32,7 +57,7 @@ class Config:
             else: self.device = "cpu"
 
         if self.gpu_mem is not None and self.gpu_mem <= 4: return 1, 5, 30, 32
-        return (3, 10, 60, 65) if self.is_half else (1, 6, 38, 41)
+        return (3, 10, 60, 65) if (self.is_half if is_half is None else is_half) else (1, 6, 38, 41)
 
     def set_cuda_config(self):
         i_device = int(self.device.split(":")[-1])
@@ -0,0 +1,123 @@
+import os
+import sys
+import json
+import torch
+import struct
+import argparse
+
+import numpy as np
+
+from torch.nn.utils import parametrize
+
+sys.path.append(os.getcwd())
+
+from modules.synthesizers import Synthesizer
+
+dtypes = {torch.float32: "F32", torch.float16: "F16", torch.bfloat16: "BF16", torch.int64: "I64", torch.int32: "I32", torch.uint8: "U8", torch.bool: "BOOL"}
+torch_dtypes = {v: k for k, v in dtypes.items()}
+
+def remove_parametrizations(model):
+    for module in model.modules():
+        if parametrize.is_parametrized(module):
+            for name in list(module.parametrizations.keys()):
+                parametrize.remove_parametrizations(module, name, leave_parametrized=True)
+
+    return model
+
+def build_synthesizer(config, use_f0, version, vocoder, energy):
+    net_g = Synthesizer(*config, use_f0=use_f0, text_enc_hidden_dim=768 if version == "v2" else 256, vocoder=vocoder, energy=energy)
+    del net_g.enc_q
+
+    return net_g
+
+def save_file(tensors, path, metadata=None):
+    header, offset = {}, 0
+    if metadata: header["__metadata__"] = {k: str(v) for k, v in metadata.items()}
+
+    for name, tensor in tensors.items():
+        nbytes = tensor.numel() * tensor.element_size()
+        header[name] = {"dtype": dtypes[tensor.dtype], "shape": list(tensor.shape), "data_offsets": [offset, offset + nbytes]}
+        offset += nbytes
+
+    header = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    header += b" " * (-len(header) % 8)
+
+    with open(path + ".tmp", "wb") as f:
+        f.write(struct.pack("<Q", len(header)))
+        f.write(header)
+
+        for tensor in tensors.values():
+            f.write(tensor.detach().cpu().contiguous().view(-1).view(torch.uint8).numpy().tobytes())
+
+    os.replace(path + ".tmp", path)
+    return path
+
+def read_header(path):
+    with open(path, "rb") as f:
+        size = struct.unpack("<Q", f.read(8))[0]
+        header = json.loads(f.read(size))
+
+    return header, 8 + size
+
+def load_file(path):
+    header, start = read_header(path)
+    metadata = header.pop("__metadata__", {})
+    data = torch.from_numpy(np.memmap(path, dtype=np.uint8, mode="c", offset=start)) if os.path.getsize(path) > start else torch.zeros(0, dtype=torch.uint8)
+
+    tensors = {}
+
+    for name, info in header.items():
+        begin, end = info["data_offsets"]
+        dtype = torch_dtypes[info["dtype"]]
+        chunk = data[begin:end]
+
+        tensors[name] = (chunk if begin % dtype.itemsize == 0 else chunk.clone()).view(dtype).reshape(info["shape"])
+
+    return tensors, metadata
+
+def load_checkpoint(pth_path):
+    cpt = torch.load(pth_path, map_location="cpu")
+    cpt["config"][-3] = cpt["weight"]["emb_g.weight"].shape[0]
+
+    metadata = {"config": cpt["config"], "f0": cpt.get("f0", 1), "version": cpt.get("version", "v1"), "vocoder": cpt.get("vocoder", "Default"), "energy": cpt.get("energy", False)}
+    net_g = build_synthesizer(metadata["config"], metadata["f0"], metadata["version"], metadata["vocoder"], metadata["energy"])
+    net_g.load_state_dict(cpt["weight"], strict=False)
+
+    return net_g, metadata
+
+def export_model(pth_path, output_path=None, dtype="float32"):
+    if output_path is None: output_path = os.path.splitext(pth_path)[0] + ".safetensors"
+
+    net_g, cpt = load_checkpoint(pth_path)
+    use_f0, version, vocoder, energy = cpt["f0"], cpt["version"], cpt["vocoder"], cpt["energy"]
+    remove_parametrizations(net_g.eval())
+
+    dtype = getattr(torch, dtype)
+    tensors = {name: (tensor.to(dtype) if tensor.is_floating_point() else tensor) for name, tensor in net_g.state_dict().items()}
+
+    metadata = {"format": "rvc-inference", "config": json.dumps(cpt["config"]), "f0": int(use_f0), "version": version, "vocoder": vocoder, "energy": int(bool(energy)), "sr": cpt["config"][-1]}
+    print(f"[INFO] Exported {len(tensors)} tensors ({sum(t.numel() * t.element_size() for t in tensors.values()) / 1024**2:.1f} MB) to {output_path}")
+
+    return save_file(tensors, output_path, metadata)
+
+def load_model(path, device="cpu"):
+    tensors, metadata = load_file(path)
+    if metadata.get("format") != "rvc-inference": raise ValueError(f"[ERROR] {path} is not an exported RVC inference model")
+
+    with torch.device("meta"):
+        net_g = build_synthesizer(json.loads(metadata["config"]), int(metadata["f0"]), metadata["version"], metadata["vocoder"], bool(int(metadata["energy"])))
+        remove_parametrizations(net_g)
+
+    net_g.load_state_dict(tensors, strict=True, assign=True)
+    if any(t.is_meta for t in list(net_g.parameters()) + list(net_g.buffers())): raise ValueError(f"[ERROR] {path} is missing tensors")
+
+    return net_g.eval().to(device), metadata
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pth_path", required=True)
+    parser.add_argument("--output_path", default=None)
+    parser.add_argument("--dtype", default="float32", choices=["float32", "float16", "bfloat16"])
+    args = parser.parse_args()
+
+    export_model(args.pth_path, args.output_path, args.dtype)
@@ -1377,6 +1377,21 @@ class HubertModel(BaseFairseqModel):
         res = self.forward(source, padding_mask=padding_mask, mask=mask, features_only=True, output_layer=output_layer)
         return res["features"] if ret_conv else res["x"], res["padding_mask"]
 
+    def extract_features_batch(self, sources, output_layer = None):
+        features = [self.forward_features(source).transpose(1, 2)[0] for source in sources]
+        lengths = [feature.size(0) for feature in features]
+        x = features[0].new_zeros(len(features), max(lengths), features[0].size(-1))
+        padding_mask = torch.ones(len(features), max(lengths), dtype=torch.bool, device=x.device)
+
+        for i, feature in enumerate(features):
+            x[i, : lengths[i]] = feature
+            padding_mask[i, : lengths[i]] = False
+
+        x = self.layer_norm(x)
+        if self.post_extract_proj is not None: x = self.post_extract_proj(x)
+        x, _ = self.encoder(self.dropout_input(x), padding_mask=padding_mask, layer=None if output_layer is None else output_layer - 1)
+        return x, padding_mask
+
     def get_logits(self, net_output, is_masked=True):
         return [x.float() for x in (net_output["logit_m_list"] if is_masked else net_output["logit_u_list"]) if x is not None]
 
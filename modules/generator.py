@@ -2,24 +2,16 @@ import os
 import sys
 import math
 import torch
-import parselmouth
+import functools
 
-import numba as nb
 import numpy as np
 
-from librosa import yin, pyin
-from scipy.signal import medfilt
-
 sys.path.append(os.getcwd())
 
-from modules.rmvpe import RMVPE
-from modules.utils import Autotune
-from modules.torchfcpe import FCPE
-from modules.pyworld import PYWORLD
-from modules.swipe import swipe, stonemask
-from modules.torchcrepe import CREPE, mean, median
+from modules import tracing
+from modules.cache import LRUCache, f0_cache
+from modules.utils import Autotune, clear_gpu_cache, module_bytes
 
-@nb.jit(nopython=True)
 def post_process(f0, f0_up_key, f0_mel_min, f0_mel_max):
     f0 = np.multiply(f0, pow(2, f0_up_key / 12))
 
@@ -30,33 +22,174 @@ def post_process(f0, f0_up_key, f0_mel_min, f0_mel_max):
 
     return np.rint(f0_mel).astype(np.int32), f0
 
+@functools.lru_cache(maxsize=None)
+def post_processor():
+    import numba as nb
+    return nb.jit(nopython=True)(post_process)
+
+f0_backends = {}
+
+def register_backend(f0_method, compute):
+    f0_backends[f0_method] = compute
+
+for size in ["tiny", "small", "medium", "large", "full"]:
+    register_backend(f"mangio-crepe-{size}", lambda generator, x, p_len, filter_radius, size=size: generator.get_f0_mangio_crepe(x, p_len, size))
+    register_backend(f"crepe-{size}", lambda generator, x, p_len, filter_radius, size=size: generator.get_f0_crepe(x, p_len, size))
+
+register_backend("pm", lambda generator, x, p_len, filter_radius: generator.get_f0_pm(x, p_len))
+register_backend("dio", lambda generator, x, p_len, filter_radius: generator.get_f0_pyworld(x, p_len, filter_radius, "dio"))
+register_backend("harvest", lambda generator, x, p_len, filter_radius: generator.get_f0_pyworld(x, p_len, filter_radius, "harvest"))
+register_backend("fcpe", lambda generator, x, p_len, filter_radius: generator.get_f0_fcpe(x, p_len))
+register_backend("fcpe-legacy", lambda generator, x, p_len, filter_radius: generator.get_f0_fcpe(x, p_len, legacy=True))
+register_backend("rmvpe", lambda generator, x, p_len, filter_radius: generator.get_f0_rmvpe(x, p_len))
+register_backend("rmvpe-legacy", lambda generator, x, p_len, filter_radius: generator.get_f0_rmvpe(x, p_len, legacy=True))
+register_backend("yin", lambda generator, x, p_len, filter_radius: generator.get_f0_yin(x, p_len, mode="yin"))
+register_backend("pyin", lambda generator, x, p_len, filter_radius: generator.get_f0_yin(x, p_len, mode="pyin"))
+register_backend("swipe", lambda generator, x, p_len, filter_radius: generator.get_f0_swipe(x, p_len))
+
+def predictor_spec(f0_method):
+    if f0_method.startswith(("crepe-", "mangio-crepe-")): return tuple(f0_method.rsplit("-", 1)) + (False,)
+    if f0_method in ("fcpe", "fcpe-legacy"): return "fcpe", None, f0_method == "fcpe-legacy"
+    if f0_method in ("rmvpe", "rmvpe-legacy"): return "rmvpe", None, False
+
+    return None
+
+def predictor_bytes(predictor):
+    model = getattr(predictor, "fcpe", predictor).model
+    return os.path.getsize(model.path) if hasattr(model, "path") else module_bytes(model)
+
+class PredictorPool(LRUCache):
+    def load(self, key, factory):
+        with self.lock:
+            predictor = self.get(key)
+            if predictor is not None: return predictor
+
+            predictor = factory()
+
+            evicted = len(self.items)
+            self.put(key, predictor, size=predictor_bytes(predictor))
+            if len(self.items) <= evicted: clear_gpu_cache()
+
+            return predictor
+
+predictor_pool = PredictorPool(max_bytes=int(float(os.environ.get("RVC_F0_MODEL_CACHE_MB", 1024)) * 1024**2))
+
 class Generator:
-    def __init__(self, sample_rate = 16000, hop_length = 160, f0_min = 50, f0_max = 1100, is_half = False, device = "cpu"):
+    def __init__(self, sample_rate = 16000, hop_length = 160, f0_min = 50, f0_max = 1100, is_half = False, device = "cpu", backend = "torch"):
         self.sample_rate = sample_rate
         self.hop_length = hop_length
         self.f0_min = f0_min
         self.f0_max = f0_max
         self.is_half = is_half
         self.device = device
+        self.backend = backend
         self.window = 160
         self.ref_freqs = [49.00, 51.91, 55.00, 58.27, 61.74, 65.41, 69.30, 73.42, 77.78, 82.41, 87.31, 92.50, 98.00, 103.83, 110.00, 116.54, 123.47, 130.81, 138.59, 146.83, 155.56, 164.81, 174.61, 185.00, 196.00,  207.65, 220.00, 233.08, 246.94, 261.63, 277.18, 293.66, 311.13, 329.63, 349.23, 369.99, 392.00, 415.30, 440.00, 466.16, 493.88, 523.25, 554.37, 587.33, 622.25, 659.25, 698.46, 739.99, 783.99, 830.61, 880.00, 932.33, 987.77, 1046.50]
         self.autotune = Autotune(self.ref_freqs)
         self.note_dict = self.autotune.note_dict
 
-    def calculator(self, f0_method, x, f0_up_key = 0, p_len = None, filter_radius = 3, f0_autotune = False, f0_autotune_strength = 1):
+    def predictor_key(self, method, size=None, legacy=False):
+        return (method, size, legacy, str(self.device), torch.float16 if method == "rmvpe" and self.is_half else torch.float32, self.backend if method == "rmvpe" else "torch")
+
+    def load_predictor(self, method, size=None, legacy=False):
+        return predictor_pool.load(self.predictor_key(method, size, legacy), lambda: self.build_predictor(method, size, legacy))
+
+    def preload(self, f0_methods):
+        for f0_method in f0_methods:
+            spec = predictor_spec(f0_method.strip())
+            if spec is None: continue
+
+            self.load_predictor(*spec)
+            print(f"[INFO] Preloaded F0 predictor: {f0_method.strip()}")
+
+    def build_predictor(self, method, size=None, legacy=False):
+        if method in ("crepe", "mangio-crepe"):
+            from modules.torchcrepe import CREPE
+
+            return CREPE(
+                os.path.join(
+                    "models", 
+                    f"crepe_{size}.pth"
+                ), 
+                model_size=size, 
+                hop_length=self.hop_length, 
+                batch_size=512 if method == "crepe" else self.hop_length * 2, 
+                f0_min=self.f0_min, 
+                f0_max=self.f0_max, 
+                device=self.device, 
+                sample_rate=self.sample_rate, 
+                return_periodicity=method == "crepe"
+            )
+
+        if method == "fcpe":
+            from modules.torchfcpe import FCPE
+
+            return FCPE(
+                os.path.join(
+                    "models", 
+                    ("fcpe_legacy" if legacy else "fcpe") + ".pt"
+                ), 
+                hop_length=self.hop_length, 
+                f0_min=self.f0_min, 
+                f0_max=self.f0_max, 
+                dtype=torch.float32, 
+                device=self.device, 
+                sample_rate=self.sample_rate, 
+                threshold=0.03 if legacy else 0.006, 
+                legacy=legacy
+            )
+
+        from modules.rmvpe import RMVPE
+
+        rmvpe = RMVPE(
+            os.path.join(
+                "models", 
+                "rmvpe.pt"
+            ), 
+            is_half=self.is_half, 
+            device=self.device, 
+        )
+
+        if self.backend == "onnx":
+            from modules.onnx import load_rmvpe
+            load_rmvpe(rmvpe)
+
+        return rmvpe
+
+    def calculator(self, f0_method, x, f0_up_key = 0, p_len = None, filter_radius = 3, f0_autotune = False, f0_autotune_strength = 1, use_cache = True):
         if p_len is None: p_len = x.shape[0] // self.window
-        f0 = self.compute_f0(f0_method, x, p_len, filter_radius if filter_radius % 2 != 0 else filter_radius + 1)
+        f0 = self.get_f0(f0_method, x, p_len, filter_radius if filter_radius % 2 != 0 else filter_radius + 1, use_cache)
 
-        if isinstance(f0, tuple): f0 = f0[0]
         if f0_autotune: f0 = Autotune.autotune_f0(self, f0, f0_autotune_strength)
 
-        return post_process(
+        return post_processor()(
             f0, 
             f0_up_key, 
             1127 * math.log(1 + self.f0_min / 700), 
             1127 * math.log(1 + self.f0_max / 700), 
         )
 
+    def get_f0(self, f0_method, x, p_len, filter_radius, use_cache = True):
+        if not use_cache:
+            with tracing.stage(f"f0.{f0_method}"):
+                f0 = self.compute_f0(f0_method, x, p_len, filter_radius)
+
+            return f0[0] if isinstance(f0, tuple) else f0
+
+        key = f0_cache.key(x, f0_method, self.sample_rate, self.hop_length, filter_radius, self.f0_min, self.f0_max, p_len, self.backend, self.is_half)
+
+        f0 = f0_cache.get(key)
+        if f0 is not None:
+            tracing.count("f0_cache_hits")
+            return f0.copy()
+
+        with tracing.stage(f"f0.{f0_method}"):
+            f0 = self.compute_f0(f0_method, x, p_len, filter_radius)
+
+        if isinstance(f0, tuple): f0 = f0[0]
+
+        return f0_cache.put(key, f0).copy()
+
     def _resize_f0(self, x, target_len):
         source = np.array(x)
         source[source < 0.001] = np.nan
@@ -70,30 +203,11 @@ class Generator:
         )
     
     def compute_f0(self, f0_method, x, p_len, filter_radius):
-        return {
-            "pm": lambda: self.get_f0_pm(x, p_len), 
-            "dio": lambda: self.get_f0_pyworld(x, p_len, filter_radius, "dio"), 
-            "mangio-crepe-tiny": lambda: self.get_f0_mangio_crepe(x, p_len, "tiny"), 
-            "mangio-crepe-small": lambda: self.get_f0_mangio_crepe(x, p_len, "small"), 
-            "mangio-crepe-medium": lambda: self.get_f0_mangio_crepe(x, p_len, "medium"), 
-            "mangio-crepe-large": lambda: self.get_f0_mangio_crepe(x, p_len, "large"), 
-            "mangio-crepe-full": lambda: self.get_f0_mangio_crepe(x, p_len, "full"), 
-            "crepe-tiny": lambda: self.get_f0_crepe(x, p_len, "tiny"), 
-            "crepe-small": lambda: self.get_f0_crepe(x, p_len, "small"), 
-            "crepe-medium": lambda: self.get_f0_crepe(x, p_len, "medium"), 
-            "crepe-large": lambda: self.get_f0_crepe(x, p_len, "large"), 
-            "crepe-full": lambda: self.get_f0_crepe(x, p_len, "full"), 
-            "fcpe": lambda: self.get_f0_fcpe(x, p_len), 
-            "fcpe-legacy": lambda: self.get_f0_fcpe(x, p_len, legacy=True), 
-            "rmvpe": lambda: self.get_f0_rmvpe(x, p_len), 
-            "rmvpe-legacy": lambda: self.get_f0_rmvpe(x, p_len, legacy=True), 
-            "harvest": lambda: self.get_f0_pyworld(x, p_len, filter_radius, "harvest"), 
-            "yin": lambda: self.get_f0_yin(x, p_len, mode="yin"), 
-            "pyin": lambda: self.get_f0_yin(x, p_len, mode="pyin"), 
-            "swipe": lambda: self.get_f0_swipe(x, p_len)
-        }[f0_method]()
+        return f0_backends[f0_method](self, x, p_len, filter_radius)
     
     def get_f0_pm(self, x, p_len):
+        import parselmouth
+
         f0 = (
             parselmouth.Sound(
                 x, 
@@ -112,21 +226,7 @@ class Generator:
         return f0
     
     def get_f0_mangio_crepe(self, x, p_len, model="full"):
-        if not hasattr(self, "mangio_crepe"):
-            self.mangio_crepe = CREPE(
-                os.path.join(
-                    "models", 
-                    f"crepe_{model}.pth"
-                ), 
-                model_size=model, 
-                hop_length=self.hop_length, 
-                batch_size=self.hop_length * 2, 
-                f0_min=self.f0_min, 
-                f0_max=self.f0_max, 
-                device=self.device, 
-                sample_rate=self.sample_rate, 
-                return_periodicity=False
-            )
+        crepe = self.load_predictor("mangio-crepe", model)
 
         x = x.astype(np.float32)
         x /= np.quantile(np.abs(x), 0.999)
@@ -134,67 +234,36 @@ class Generator:
         audio = torch.unsqueeze(torch.from_numpy(x).to(self.device, copy=True), dim=0)
         if audio.ndim == 2 and audio.shape[0] > 1: audio = torch.mean(audio, dim=0, keepdim=True).detach()
 
-        f0 = self.mangio_crepe.compute_f0(audio.detach(), pad=True)
+        f0 = crepe.compute_f0(audio.detach(), pad=True, hop_length=self.hop_length, batch_size=self.hop_length * 2)
         return self._resize_f0(f0.squeeze(0).cpu().float().numpy(), p_len)
     
     def get_f0_crepe(self, x, p_len, model="full"):
-        if not hasattr(self, "crepe"):
-            self.crepe = CREPE(
-                os.path.join(
-                    "models", 
-                    f"crepe_{model}.pth"
-                ), 
-                model_size=model, 
-                hop_length=self.hop_length, 
-                batch_size=512, 
-                f0_min=self.f0_min, 
-                f0_max=self.f0_max, 
-                device=self.device, 
-                sample_rate=self.sample_rate, 
-                return_periodicity=True
-            )
+        from modules.torchcrepe import mean, median
 
-        f0, pd = self.crepe.compute_f0(torch.tensor(np.copy(x))[None].float(), pad=True)
+        crepe = self.load_predictor("crepe", model)
+
+        f0, pd = crepe.compute_f0(torch.tensor(np.copy(x))[None].float(), pad=True, hop_length=self.hop_length)
         f0, pd = mean(f0, 3), median(pd, 3)
         f0[pd < 0.1] = 0
 
         return self._resize_f0(f0[0].cpu().numpy(), p_len)
     
     def get_f0_fcpe(self, x, p_len, legacy=False):
-        if not hasattr(self, "fcpe"): 
-            self.fcpe = FCPE(
-                os.path.join(
-                    "models", 
-                    ("fcpe_legacy" if legacy else "fcpe") + ".pt"
-                ), 
-                hop_length=self.hop_length, 
-                f0_min=self.f0_min, 
-                f0_max=self.f0_max, 
-                dtype=torch.float32, 
-                device=self.device, 
-                sample_rate=self.sample_rate, 
-                threshold=0.03 if legacy else 0.006, 
-                legacy=legacy
-            )
-        
-        f0 = self.fcpe.compute_f0(x, p_len)
+        fcpe = self.load_predictor("fcpe", legacy=legacy)
+
+        f0 = fcpe.compute_f0(x, p_len, hop_length=self.hop_length)
         return f0
     
     def get_f0_rmvpe(self, x, p_len, legacy=False):
-        if not hasattr(self, "rmvpe"): 
-            self.rmvpe = RMVPE(
-                os.path.join(
-                    "models", 
-                    "rmvpe.pt"
-                ), 
-                is_half=self.is_half, 
-                device=self.device, 
-            )
+        rmvpe = self.load_predictor("rmvpe")
 
-        f0 = self.rmvpe.infer_from_audio_with_pitch(x, thred=0.03, f0_min=self.f0_min, f0_max=self.f0_max) if legacy else self.rmvpe.infer_from_audio(x, thred=0.03)
+        f0 = rmvpe.infer_from_audio_with_pitch(x, thred=0.03, f0_min=self.f0_min, f0_max=self.f0_max) if legacy else rmvpe.infer_from_audio(x, thred=0.03)
         return self._resize_f0(f0, p_len)
     
     def get_f0_pyworld(self, x, p_len, filter_radius, model="harvest"):
+        from scipy.signal import medfilt
+        from modules.pyworld import PYWORLD
+
         if not hasattr(self, "pw"): self.pw = PYWORLD()
 
         x = x.astype(np.double)
@@ -223,6 +292,8 @@ class Generator:
         return self._resize_f0(f0, p_len)
     
     def get_f0_swipe(self, x, p_len):
+        from modules.swipe import swipe, stonemask
+
         f0, t = swipe(
             x.astype(np.float32), 
             self.sample_rate, 
@@ -242,6 +313,8 @@ class Generator:
         )
     
     def get_f0_yin(self, x, p_len, mode="yin"):
+        from librosa import yin, pyin
+
         self.if_yin = mode == "yin"
         self.yin = yin if self.if_yin else pyin
 
@@ -1,23 +1,30 @@
 import os
 import sys
-import torch
+import time
+import queue
 import librosa
 import logging
 import warnings
+import threading
 
 import numpy as np
 import soundfile as sf
 
+from itertools import islice
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
 warnings.filterwarnings("ignore")
 sys.path.append(os.getcwd())
 
-from modules import fairseq
+from modules import fairseq, export, onnx, quantization, compiled, encoders, attentions, tracing
 from modules.config import Config
 from modules.cut import cut, restore
 from modules.pipeline import Pipeline
-from modules.utils import clear_gpu_cache
-from modules.synthesizers import Synthesizer
-from modules.utils import check_predictors, check_embedders, load_audio
+from modules.generator import Generator, predictor_pool
+from modules.cache import LRUCache, file_key
+from modules.utils import clear_gpu_cache, module_bytes
+from modules.utils import check_predictors, check_embedders, load_audio, audio_peak, stream_audio
 
 for l in ["torch", "faiss", "omegaconf", "httpx", "httpcore", "faiss.loader", "numba.core", "urllib3", "transformers", "matplotlib"]:
     logging.getLogger(l).setLevel(logging.ERROR)
@@ -43,16 +50,30 @@ def run_inference_script(
     f0_autotune_strength=1, 
     split_audio=False,
     clean_audio=False, 
-    clean_strength=0.7
+    clean_strength=0.7,
+    batch_size=1,
+    embed_chunk=0,
+    prefetch=2,
+    backend="torch",
+    quantize=None,
+    compile_mode=None,
+    trace=False,
+    profile_memory=False,
+    stream=False,
+    segment_time=30,
+    cvt=None
 ):
     check_predictors(f0_method); check_embedders(embedder_model)
+    if trace or profile_memory: tracing.enable(memory=profile_memory)
     
-    if not pth_path or not os.path.exists(pth_path) or os.path.isdir(pth_path) or not pth_path.endswith(".pth"):
+    if not pth_path or not os.path.exists(pth_path) or os.path.isdir(pth_path) or not pth_path.endswith((".pth", ".safetensors")):
         print("[WARNING] Please enter a valid model.")
         return
 
-    config = Config(is_half=is_half, cpu_mode=cpu_mode)
-    cvt = VoiceConverter(config, pth_path, 0)
+    if cvt is None: cvt = VoiceConverter(Config(is_half=is_half, cpu_mode=cpu_mode, backend=backend, quantize=quantize, compile_mode=compile_mode), pth_path, 0)
+    else:
+        if (backend, quantize, compile_mode) != (cvt.config.backend, cvt.config.quantize, cvt.config.compile_mode): raise ValueError(f"[ERROR] Requested backend={backend}, quantize={quantize}, compile_mode={compile_mode} but the loaded converter uses backend={cvt.config.backend}, quantize={cvt.config.quantize}, compile_mode={cvt.config.compile_mode}.")
+        cvt.get_vc(pth_path, 0)
 
     if os.path.isdir(input_path):
         print("[INFO] Use batch conversion...")
@@ -64,16 +85,35 @@ def run_inference_script(
 
         print(f"[INFO] Found {len(audio_files)} audio files for conversion.")
 
-        for audio in audio_files:
-            audio_path = os.path.join(input_path, audio)
-            output_audio = os.path.join(input_path, os.path.splitext(audio)[0] + f"_output.{export_format}")
-
-            print(f"[INFO] Conversion '{audio_path}'...")
-            if os.path.exists(output_audio): os.remove(output_audio)
-
-            cvt.convert_audio(
-                audio_input_path=audio_path, 
-                audio_output_path=output_audio, 
+        if stream:
+            for audio in audio_files:
+                print(f"[INFO] Conversion '{os.path.join(input_path, audio)}'...")
+                cvt.convert_stream(
+                    audio_input_path=os.path.join(input_path, audio), 
+                    audio_output_path=os.path.join(input_path, os.path.splitext(audio)[0] + f"_output.{export_format}"), 
+                    index_path=index_path, 
+                    embedder_model=embedder_model, 
+                    pitch=pitch, 
+                    f0_method=f0_method, 
+                    index_rate=index_rate, 
+                    volume_envelope=volume_envelope, 
+                    protect=protect, 
+                    hop_length=hop_length, 
+                    filter_radius=filter_radius, 
+                    export_format=export_format, 
+                    resample_sr=resample_sr, 
+                    f0_autotune=f0_autotune, 
+                    f0_autotune_strength=f0_autotune_strength,
+                    clean_audio=clean_audio,
+                    clean_strength=clean_strength,
+                    batch_size=batch_size,
+                    embed_chunk=embed_chunk,
+                    segment_time=segment_time
+                )
+        else: 
+            cvt.convert_files(
+                audio_paths=[os.path.join(input_path, audio) for audio in audio_files], 
+                audio_output_paths=[os.path.join(input_path, os.path.splitext(audio)[0] + f"_output.{export_format}") for audio in audio_files], 
                 index_path=index_path, 
                 embedder_model=embedder_model, 
                 pitch=pitch, 
@@ -89,7 +129,10 @@ def run_inference_script(
                 f0_autotune_strength=f0_autotune_strength,
                 split_audio=split_audio,
                 clean_audio=clean_audio,
-                clean_strength=clean_strength
+                clean_strength=clean_strength,
+                batch_size=batch_size,
+                embed_chunk=embed_chunk,
+                prefetch=prefetch
             )
 
         print("[INFO] Conversion complete.")
@@ -101,26 +144,52 @@ def run_inference_script(
         print(f"[INFO] Conversion '{input_path}'...")
         if os.path.exists(output_path): os.remove(output_path)
 
-        cvt.convert_audio(
-            audio_input_path=input_path, 
-            audio_output_path=output_path, 
-            index_path=index_path, 
-            embedder_model=embedder_model, 
-            pitch=pitch, 
-            f0_method=f0_method, 
-            index_rate=index_rate, 
-            volume_envelope=volume_envelope, 
-            protect=protect, 
-            hop_length=hop_length, 
-            filter_radius=filter_radius,  
-            export_format=export_format, 
-            resample_sr=resample_sr, 
-            f0_autotune=f0_autotune, 
-            f0_autotune_strength=f0_autotune_strength,
-            split_audio=split_audio,
-            clean_audio=clean_audio,
-            clean_strength=clean_strength
-        )
+        if stream: 
+            cvt.convert_stream(
+                audio_input_path=input_path, 
+                audio_output_path=output_path, 
+                index_path=index_path, 
+                embedder_model=embedder_model, 
+                pitch=pitch, 
+                f0_method=f0_method, 
+                index_rate=index_rate, 
+                volume_envelope=volume_envelope, 
+                protect=protect, 
+                hop_length=hop_length, 
+                filter_radius=filter_radius, 
+                export_format=export_format, 
+                resample_sr=resample_sr, 
+                f0_autotune=f0_autotune, 
+                f0_autotune_strength=f0_autotune_strength,
+                clean_audio=clean_audio,
+                clean_strength=clean_strength,
+                batch_size=batch_size,
+                embed_chunk=embed_chunk,
+                segment_time=segment_time
+            )
+        else: 
+            cvt.convert_audio(
+                audio_input_path=input_path, 
+                audio_output_path=output_path, 
+                index_path=index_path, 
+                embedder_model=embedder_model, 
+                pitch=pitch, 
+                f0_method=f0_method, 
+                index_rate=index_rate, 
+                volume_envelope=volume_envelope, 
+                protect=protect, 
+                hop_length=hop_length, 
+                filter_radius=filter_radius,  
+                export_format=export_format, 
+                resample_sr=resample_sr, 
+                f0_autotune=f0_autotune, 
+                f0_autotune_strength=f0_autotune_strength,
+                split_audio=split_audio,
+                clean_audio=clean_audio,
+                clean_strength=clean_strength,
+                batch_size=batch_size,
+                embed_chunk=embed_chunk
+            )
 
         print("[INFO] Conversion complete.")
 
@@ -129,10 +198,11 @@ class VoiceConverter:
         self.config = config
         self.device = config.device
         self.hubert_model = None
+        self.embedder_model = None
         self.tgt_sr = None 
         self.net_g = None 
         self.vc = None
-        self.cpt = None  
+        self.model = None
         self.version = None 
         self.n_spk = None  
         self.use_f0 = None  
@@ -161,82 +231,375 @@ class VoiceConverter:
         f0_autotune_strength=1,
         split_audio=False,
         clean_audio=False,
-        clean_strength=0.5
+        clean_strength=0.5,
+        batch_size=1,
+        embed_chunk=0
     ):
         try:
-            audio = load_audio(audio_input_path, self.sample_rate)
-            audio_max = np.abs(audio).max() / 0.95
-            if audio_max > 1: audio /= audio_max
-
-            if not self.hubert_model:
-                embedder_model_path = os.path.join("models", embedder_model + ".pt")
-                if not os.path.exists(embedder_model_path): raise FileNotFoundError(f"[ERROR] Not found embeddeder: {embedder_model}")
-
-                models = fairseq.load_model(embedder_model_path).to(self.device).eval()
-                self.hubert_model = models.half() if self.config.is_half else models.float()
-
-            if split_audio:
-                chunks = cut(
-                    audio, 
-                    self.sample_rate, 
-                    db_thresh=-60, 
-                    min_interval=500
-                )  
-                print(f"Split Total: {len(chunks)}")
-            else: chunks = [(audio, 0, 0)]
-
-            converted_chunks = [
-                (
-                    start, 
-                    end, 
-                    self.vc.pipeline(
-                        model=self.hubert_model, 
-                        net_g=self.net_g, 
-                        sid=self.sid, 
-                        audio=waveform, 
-                        f0_up_key=pitch, 
+            with tracing.job(os.path.splitext(os.path.basename(audio_input_path))[0]):
+                self.write_audio(
+                    audio_output_path, 
+                    self.convert_array(
+                        self.read_audio(audio_input_path), 
+                        index_path=index_path, 
+                        embedder_model=embedder_model, 
+                        pitch=pitch, 
                         f0_method=f0_method, 
-                        file_index=(
-                            index_path.strip().strip('"').strip("\n").strip('"').strip().replace("trained", "added")
-                        ), 
                         index_rate=index_rate, 
-                        pitch_guidance=self.use_f0, 
+                        volume_envelope=volume_envelope, 
+                        protect=protect, 
+                        hop_length=hop_length, 
                         filter_radius=filter_radius, 
+                        f0_autotune=f0_autotune, 
+                        f0_autotune_strength=f0_autotune_strength,
+                        split_audio=split_audio,
+                        batch_size=batch_size,
+                        embed_chunk=embed_chunk
+                    ), 
+                    export_format=export_format, 
+                    resample_sr=resample_sr, 
+                    clean_audio=clean_audio, 
+                    clean_strength=clean_strength
+                )
+        except Exception as e:
+            import traceback
+            print(traceback.format_exc())
+            print(f"[ERROR] An error has occurred: {e}")
+
+    def convert_files(
+        self, 
+        audio_paths, 
+        audio_output_paths, 
+        index_path, 
+        embedder_model, 
+        pitch, 
+        f0_method, 
+        index_rate, 
+        volume_envelope, 
+        protect, 
+        hop_length, 
+        filter_radius, 
+        export_format, 
+        resample_sr = 0, 
+        f0_autotune=False, 
+        f0_autotune_strength=1,
+        split_audio=False,
+        clean_audio=False,
+        clean_strength=0.5,
+        batch_size=1,
+        embed_chunk=0,
+        prefetch=2
+    ):
+        busy = {"decode": 0.0, "convert": 0.0, "write": 0.0}
+        lock = threading.Lock()
+        write_queue = queue.Queue(maxsize=max(prefetch, 1))
+
+        def timed(stage, func, *args, **kwargs):
+            start = time.perf_counter()
+
+            try:
+                return func(*args, **kwargs)
+            finally:
+                with lock:
+                    busy[stage] += time.perf_counter() - start
+
+        def writer():
+            while 1:
+                job = write_queue.get()
+                if job is None: return
+
+                try:
+                    timed("write", self.write_audio, job[0], job[1], export_format=export_format, resample_sr=resample_sr, clean_audio=clean_audio, clean_strength=clean_strength)
+                except Exception as e:
+                    print(f"[ERROR] An error has occurred while writing '{job[0]}': {e}")
+
+        start = time.perf_counter()
+        writer_thread = threading.Thread(target=writer, daemon=True)
+        writer_thread.start()
+
+        with tracing.job(f"batch_{len(audio_paths)}"), ThreadPoolExecutor(max_workers=max(prefetch, 1)) as executor:
+            jobs = iter(zip(audio_paths, audio_output_paths))
+            pending = deque((audio_path, audio_output_path, executor.submit(timed, "decode", self.read_audio, audio_path)) for audio_path, audio_output_path in islice(jobs, max(prefetch, 1)))
+
+            while pending:
+                audio_path, audio_output_path, future = pending.popleft()
+                for next_path, next_output_path in islice(jobs, 1): pending.append((next_path, next_output_path, executor.submit(timed, "decode", self.read_audio, next_path)))
+
+                print(f"[INFO] Conversion '{audio_path}'...")
+                if os.path.exists(audio_output_path): os.remove(audio_output_path)
+
+                try:
+                    audio_output = timed(
+                        "convert", 
+                        self.convert_array, 
+                        future.result(), 
+                        index_path=index_path, 
+                        embedder_model=embedder_model, 
+                        pitch=pitch, 
+                        f0_method=f0_method, 
+                        index_rate=index_rate, 
                         volume_envelope=volume_envelope, 
-                        version=self.version, 
                         protect=protect, 
                         hop_length=hop_length, 
-                        energy_use=self.energy,
+                        filter_radius=filter_radius, 
                         f0_autotune=f0_autotune, 
-                        f0_autotune_strength=f0_autotune_strength
+                        f0_autotune_strength=f0_autotune_strength,
+                        split_audio=split_audio,
+                        batch_size=batch_size,
+                        embed_chunk=embed_chunk
                     )
-                ) for waveform, start, end in chunks
-            ]
+                except Exception as e:
+                    import traceback
+                    print(traceback.format_exc())
+                    print(f"[ERROR] An error has occurred: {e}")
+                    continue
+
+                write_queue.put((audio_output_path, audio_output))
+
+            write_queue.put(None)
+            writer_thread.join()
+
+        elapsed = time.perf_counter() - start
+        workers = {"decode": max(prefetch, 1), "convert": 1, "write": 1}
+        print(f"[INFO] Converted {len(audio_paths)} files in {elapsed:.2f}s. Stage utilisation: " + ", ".join(f"{stage} {busy[stage]:.2f}s ({100 * busy[stage] / max(elapsed * workers[stage], 1e-9):.0f}%)" for stage in busy))
+
+        return busy, elapsed
+
+    def convert_stream(
+        self,
+        audio_input_path,
+        audio_output_path,
+        index_path,
+        embedder_model,
+        pitch,
+        f0_method,
+        index_rate,
+        volume_envelope,
+        protect,
+        hop_length,
+        filter_radius,
+        export_format,
+        resample_sr = 0,
+        f0_autotune=False,
+        f0_autotune_strength=1,
+        clean_audio=False,
+        clean_strength=0.5,
+        batch_size=1,
+        embed_chunk=0,
+        segment_time=30,
+        context_time=1,
+        fade_time=0.02
+    ):
+        segment, context, search = int(segment_time * self.sample_rate), int(context_time * self.sample_rate), int(min(segment_time / 4, 2) * self.sample_rate)
 
-            audio_output = restore(
-                converted_chunks, 
-                total_len=len(audio), 
-                dtype=converted_chunks[0][2].dtype
-            ) if split_audio else converted_chunks[0][2]
+        try:
+            with tracing.job(os.path.splitext(os.path.basename(audio_input_path))[0]):
+                with tracing.stage("peak"):
+                    audio_max = audio_peak(audio_input_path) / 0.95
+
+                gain = 1 / audio_max if audio_max > 1 else 1
+                blocks = stream_audio(audio_input_path, self.sample_rate)
+                buffer, base, start, done, tail = np.zeros(0, dtype=np.float32), 0, 0, False, None
+
+                ratio = self.tgt_sr / self.sample_rate
+                fade = int(fade_time * self.tgt_sr)
+                resampler = None
+
+                if resample_sr > 0 and resample_sr != self.tgt_sr:
+                    import soxr
+                    resampler = soxr.ResampleStream(self.tgt_sr, resample_sr, 1, dtype="float32", quality="VHQ")
+
+                with sf.SoundFile(audio_output_path, "w", samplerate=resample_sr if resampler is not None else self.tgt_sr, channels=1, format=export_format) as f:
+                    while 1:
+                        while not done and base + buffer.shape[0] < start + segment + context:
+                            with tracing.stage("decode"):
+                                block = next(blocks, None)
+
+                            if block is None: done = True
+                            else:
+                                tracing.count("audio_seconds", block.shape[0] / self.sample_rate)
+                                buffer = np.concatenate([buffer, block * gain])
+
+                        total = base + buffer.shape[0]
+                        if total <= start: break
+
+                        if done and total - start <= segment + search: end = total
+                        else:
+                            window = buffer[start + segment - search - base : start + segment - base]
+                            energy = np.square(window[: window.shape[0] // self.vc.window * self.vc.window].reshape(-1, self.vc.window)).sum(axis=1)
+                            end = start + segment - search + int(np.argmin(energy)) * self.vc.window + self.vc.window // 2
+
+                        lo, hi = max(start - context, base), min(end + context, total)
+                        output = self.convert_array(
+                            buffer[lo - base : hi - base],
+                            index_path=index_path,
+                            embedder_model=embedder_model,
+                            pitch=pitch,
+                            f0_method=f0_method,
+                            index_rate=index_rate,
+                            volume_envelope=volume_envelope,
+                            protect=protect,
+                            hop_length=hop_length,
+                            filter_radius=filter_radius,
+                            f0_autotune=f0_autotune,
+                            f0_autotune_strength=f0_autotune_strength,
+                            batch_size=batch_size,
+                            embed_chunk=embed_chunk,
+                            normalize=False
+                        ).astype(np.float32)
+
+                        offset, length = round((start - lo) * ratio), round(end * ratio) - round(start * ratio)
+                        core = output[offset : offset + length]
+                        if core.shape[0] < length: core = np.pad(core, (0, length - core.shape[0]))
+
+                        if tail is not None and tail.shape[0]:
+                            n = min(tail.shape[0], core.shape[0])
+                            weight = np.linspace(0, 1, n, dtype=np.float32)
+                            core[:n] = tail[:n] * (1 - weight) + core[:n] * weight
+
+                        tail = output[offset + length : offset + length + fade].copy()
+                        self.write_block(f, np.clip(core, -0.99, 0.99), resampler, clean_audio, clean_strength)
+
+                        if end >= total and done: break
+                        start = end
+
+                        drop = start - context - base
+                        if drop > 0: buffer, base = buffer[drop:], base + drop
+
+                    if resampler is not None: self.write_block(f, resampler.resample_chunk(np.zeros(0, dtype=np.float32), last=True), None, clean_audio, clean_strength)
+        except Exception as e:
+            import traceback
+            print(traceback.format_exc())
+            print(f"[ERROR] An error has occurred: {e}")
 
-            if self.tgt_sr != resample_sr and resample_sr > 0: 
-                audio_output = librosa.resample(audio_output, orig_sr=self.tgt_sr, target_sr=resample_sr, res_type="soxr_vhq")
-                self.tgt_sr = resample_sr
+    def write_block(self, f, audio_output, resampler=None, clean_audio=False, clean_strength=0.5):
+        if resampler is not None:
+            with tracing.stage("resample"):
+                audio_output = resampler.resample_chunk(audio_output)
 
-            if clean_audio:
-                from modules.noisereduce import reduce_noise
+        if not audio_output.shape[0]: return
+
+        if clean_audio:
+            from modules.noisereduce import reduce_noise
+
+            with tracing.stage("reduce_noise"):
+                audio_output = reduce_noise(
+                    y=audio_output,
+                    sr=f.samplerate,
+                    prop_decrease=clean_strength,
+                    device=self.device
+                )
+
+        with tracing.stage("write"):
+            f.write(audio_output)
+
+    def read_audio(self, audio_input_path):
+        with tracing.stage("decode"):
+            audio = load_audio(audio_input_path, self.sample_rate)
+
+        tracing.count("audio_seconds", len(audio) / self.sample_rate)
+        audio_max = np.abs(audio).max() / 0.95
+        if audio_max > 1: audio /= audio_max
+
+        return audio
+
+    def convert_array(
+        self, 
+        audio, 
+        index_path, 
+        embedder_model, 
+        pitch, 
+        f0_method, 
+        index_rate, 
+        volume_envelope, 
+        protect, 
+        hop_length, 
+        filter_radius, 
+        f0_autotune=False, 
+        f0_autotune_strength=1,
+        split_audio=False,
+        batch_size=1,
+        embed_chunk=0,
+        normalize=True
+    ):
+        self.load_embedder(embedder_model)
+
+        if split_audio:
+            with tracing.stage("split"):
+                chunks = cut(
+                    audio, 
+                    self.sample_rate, 
+                    db_thresh=-60, 
+                    min_interval=500
+                )  
+
+            print(f"Split Total: {len(chunks)}")
+        else: chunks = [(audio, 0, 0)]
+
+        converted_chunks = [
+            (
+                start, 
+                end, 
+                self.vc.pipeline(
+                    model=self.hubert_model, 
+                    net_g=self.net_g, 
+                    sid=self.sid, 
+                    audio=waveform, 
+                    f0_up_key=pitch, 
+                    f0_method=f0_method, 
+                    file_index=(
+                        index_path.strip().strip('"').strip("\n").strip('"').strip().replace("trained", "added")
+                    ), 
+                    index_rate=index_rate, 
+                    pitch_guidance=self.use_f0, 
+                    filter_radius=filter_radius, 
+                    volume_envelope=volume_envelope, 
+                    version=self.version, 
+                    protect=protect, 
+                    hop_length=hop_length, 
+                    energy_use=self.energy,
+                    f0_autotune=f0_autotune, 
+                    f0_autotune_strength=f0_autotune_strength,
+                    batch_size=batch_size,
+                    embedder_model=embedder_model,
+                    embed_chunk=embed_chunk,
+                    normalize=normalize
+                )
+            ) for waveform, start, end in chunks
+        ]
+
+        return restore(
+            converted_chunks, 
+            total_len=len(audio), 
+            dtype=converted_chunks[0][2].dtype
+        ) if split_audio else converted_chunks[0][2]
+
+    def write_audio(self, audio_output_path, audio_output, export_format, resample_sr=0, clean_audio=False, clean_strength=0.5):
+        sample_rate = self.tgt_sr
+
+        if sample_rate != resample_sr and resample_sr > 0: 
+            with tracing.stage("resample"):
+                audio_output = librosa.resample(audio_output, orig_sr=sample_rate, target_sr=resample_sr, res_type="soxr_vhq")
+
+            sample_rate = resample_sr
+
+        if clean_audio:
+            from modules.noisereduce import reduce_noise
+
+            with tracing.stage("reduce_noise"):
                 audio_output = reduce_noise(
                     y=audio_output, 
-                    sr=self.tgt_sr, 
+                    sr=sample_rate, 
                     prop_decrease=clean_strength, 
                     device=self.device
                 ) 
 
-            sf.write(audio_output_path, audio_output, self.tgt_sr, format=export_format)
-        except Exception as e:
-            import traceback
-            print(traceback.format_exc())
-            print(f"[ERROR] An error has occurred: {e}")
+        with tracing.stage("write"):
+            sf.write(audio_output_path, audio_output, sample_rate, format=export_format)
+
+    def load_embedder(self, embedder_model):
+        self.hubert_model = model_registry.load_embedder(embedder_model, self.config, self.model["is_half"] if self.model is not None else None)
+        self.embedder_model = embedder_model
 
     def get_vc(self, weight_root, sid):
         if sid == "" or sid == []:
@@ -246,7 +609,7 @@ class VoiceConverter:
         if not self.loaded_model or self.loaded_model != weight_root:
             self.loaded_model = weight_root
             self.load_model()
-            if self.cpt is not None: self.setup()
+            if self.model is not None: self.setup()
 
     def cleanup(self):
         if self.hubert_model is not None:
@@ -254,31 +617,133 @@ class VoiceConverter:
             self.hubert_model = self.net_g = self.n_spk = self.vc = self.tgt_sr = None
             clear_gpu_cache()
 
-        del self.net_g, self.cpt
+        del self.net_g, self.model
         clear_gpu_cache()
-        self.cpt = None
+        self.model = None
 
     def load_model(self):
-        if os.path.isfile(self.loaded_model): self.cpt = torch.load(self.loaded_model, map_location="cpu")  
-        else: self.cpt = None
+        if os.path.isfile(self.loaded_model): self.model = model_registry.load(self.loaded_model, self.config)
+        else: self.model = None
 
     def setup(self):
-        if self.cpt is not None:
-            self.tgt_sr = self.cpt["config"][-1]
-            self.cpt["config"][-3] = self.cpt["weight"]["emb_g.weight"].shape[0]
+        if self.model is not None:
+            self.tgt_sr = self.model["tgt_sr"]
+            self.use_f0 = self.model["use_f0"]
+            self.version = self.model["version"]
+            self.vocoder = self.model["vocoder"]
+            self.energy = self.model["energy"]
+            self.net_g = self.model["net_g"]
+            self.n_spk = self.model["n_spk"]
+
+            self.vc = model_registry.pipeline(self.tgt_sr, self.config, self.model["is_half"])
+
+class ModelRegistry(LRUCache):
+    def __init__(self, max_bytes=None, max_items=None):
+        super().__init__(max_bytes, max_items)
+        self.pipelines = {}
+        self.generators = {}
+
+    def key(self, model_path, config):
+        return file_key(model_path) + (config.is_half, config.device, config.backend, config.quantize, config.compile_mode)
+
+    def is_loaded(self, model_path, config):
+        return os.path.isfile(model_path) and self.key(model_path, config) in self
+
+    def load(self, model_path, config):
+        key = self.key(model_path, config)
+
+        with self.lock:
+            model = self.get(key)
+            if model is not None: return model
+
+            if model_path.endswith(".safetensors"):
+                net_g, metadata = export.load_model(model_path)
+                model = {"tgt_sr": int(metadata["sr"]), "use_f0": int(metadata["f0"]), "version": metadata["version"], "vocoder": metadata["vocoder"], "energy": bool(int(metadata["energy"])), "n_spk": net_g.emb_g.weight.shape[0]}
+            else:
+                net_g, metadata = export.load_checkpoint(model_path)
+                model = {"tgt_sr": metadata["config"][-1], "use_f0": metadata["f0"], "version": metadata["version"], "vocoder": metadata["vocoder"], "energy": metadata["energy"], "n_spk": metadata["config"][-3]}
+                export.remove_parametrizations(net_g)
+
+            model["is_half"] = config.is_half and model["vocoder"] == "Default"
+            net_g.eval().to(config.device)
+            model["net_g"] = net_g = (net_g.half() if model["is_half"] else net_g.float())
+            if config.quantize is not None: net_g.enc_p = quantization.load_quantized(model_path, lambda: net_g.enc_p, f"enc_p_{config.quantize}", (encoders.__file__, attentions.__file__))
+            size = module_bytes(net_g)
+
+            if config.backend == "onnx":
+                model["net_g"] = onnx.load_synthesizer(model_path, net_g)
+                size = os.path.getsize(model["net_g"].module.path)
+                del net_g
 
-            self.use_f0 = self.cpt.get("f0", 1)
-            self.version = self.cpt.get("version", "v1")
-            self.vocoder = self.cpt.get("vocoder", "Default")
-            self.energy = self.cpt.get("energy", False)
+            if config.compile_mode is not None: model["net_g"] = compiled.CompiledSynthesizer(net_g, model_path, config.compile_mode)
 
-            if self.vocoder != "Default": self.config.is_half = False
-            self.net_g = Synthesizer(*self.cpt["config"], use_f0=self.use_f0, text_enc_hidden_dim=768 if self.version == "v2" else 256, vocoder=self.vocoder, energy=self.energy)
-            del self.net_g.enc_q
+            evicted = len(self.items)
+            self.put(key, model, size=size)
+            if len(self.items) <= evicted: clear_gpu_cache()
 
-            self.net_g.load_state_dict(self.cpt["weight"], strict=False)
-            self.net_g.eval().to(self.device)
-            self.net_g = (self.net_g.half() if self.config.is_half else self.net_g.float())
-            self.n_spk = self.cpt["config"][-3]
+            return model
+
+    def pipeline(self, tgt_sr, config, is_half=None):
+        is_half = config.is_half if is_half is None else is_half
+        key = (tgt_sr, is_half, config.device, config.backend, config.quantize)
+
+        with self.lock:
+            if key not in self.pipelines:
+                vc = Pipeline(tgt_sr, config, is_half)
+                vc.f0_generator = self.generator(config, is_half)
+                self.pipelines[key] = vc
+
+            return self.pipelines[key]
+
+    def generator(self, config, is_half=None):
+        is_half = config.is_half if is_half is None else is_half
+        key = (is_half, config.device, config.backend)
+
+        with self.lock:
+            if key not in self.generators:
+                self.generators[key] = Generator(16000, 160, 50, 1100, is_half, config.device, config.backend)
+                self.generators[key].preload([method for method in os.environ.get("RVC_F0_PRELOAD", "").split(",") if method.strip()])
+
+            return self.generators[key]
+
+    def embedder_key(self, embedder_model, config, is_half=None):
+        return ("embedder", embedder_model, config.is_half if is_half is None else is_half, config.device, config.backend, config.quantize)
+
+    def register_embedder(self, embedder_model, models, config, is_half=None):
+        return self.put(self.embedder_key(embedder_model, config, is_half), models, size=module_bytes(models))
+
+    def load_embedder(self, embedder_model, config, is_half=None):
+        is_half = config.is_half if is_half is None else is_half
+        key = self.embedder_key(embedder_model, config, is_half)
+
+        with self.lock:
+            models = self.get(key)
+            if models is not None: return models
+
+            embedder_model_path = os.path.join("models", embedder_model + ".pt")
+            if not os.path.exists(embedder_model_path): raise FileNotFoundError(f"[ERROR] Not found embeddeder: {embedder_model}")
+
+            if config.quantize is not None: models = quantization.load_quantized(embedder_model_path, lambda: fairseq.load_model(embedder_model_path), f"{embedder_model}_{config.quantize}", (fairseq.__file__,))
+            else:
+                models = fairseq.load_model(embedder_model_path).to(config.device).eval()
+                models = models.half() if is_half else models.float()
+
+            size = module_bytes(models)
+            if config.backend == "onnx": models = onnx.OnnxEmbedder(embedder_model, models)
+
+            evicted = len(self.items)
+            self.put(key, models, size=size)
+            if len(self.items) <= evicted: clear_gpu_cache()
+
+            return models
+
+    def clear(self):
+        with self.lock:
+            super().clear()
+            self.pipelines.clear()
+            self.generators.clear()
+            predictor_pool.clear()
+
+        clear_gpu_cache()
 
-            self.vc = Pipeline(self.tgt_sr, self.config)
\ No newline at end of file
+model_registry = ModelRegistry(max_bytes=int(float(os.environ.get("RVC_MODEL_CACHE_MB", 2048)) * 1024**2))
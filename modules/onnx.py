@@ -0,0 +1,168 @@
+import os
+import sys
+import torch
+import argparse
+
+sys.path.append(os.getcwd())
+
+onnx_dir = os.path.join("models", "onnx")
+
+def is_fresh(output, source=None):
+    return os.path.exists(output) and (source is None or not os.path.exists(source) or os.stat(output).st_mtime_ns >= os.stat(source).st_mtime_ns)
+
+def embedder_path(embedder_model, output_layer):
+    return os.path.join(onnx_dir, f"{embedder_model}_layer{output_layer}.onnx")
+
+def synthesizer_path(model_path):
+    return os.path.splitext(model_path)[0] + ".onnx"
+
+def rmvpe_path():
+    return os.path.join(onnx_dir, "rmvpe.onnx")
+
+class SynthesizerWrapper(torch.nn.Module):
+    def __init__(self, net_g):
+        super().__init__()
+        self.net_g = net_g
+
+    def forward(self, phone, phone_lengths, sid, rnd, pitch=None, pitchf=None, energy=None):
+        net_g = self.net_g
+        g = net_g.emb_g(sid).unsqueeze(-1)
+        m_p, logs_p, x_mask = net_g.enc_p(phone, pitch, phone_lengths, energy)
+        z = net_g.flow((m_p + torch.exp(logs_p) * rnd * 0.66666) * x_mask, x_mask, g=g, reverse=True)
+
+        return net_g.dec(z * x_mask, pitchf, g=g) if net_g.use_f0 else net_g.dec(z * x_mask, g=g)
+
+class EmbedderWrapper(torch.nn.Module):
+    def __init__(self, model, output_layer):
+        super().__init__()
+        self.model = model
+        self.output_layer = output_layer
+
+    def forward(self, source, padding_mask):
+        return self.model.extract_features(source=source, padding_mask=padding_mask, output_layer=self.output_layer)[0]
+
+def export(module, args, output, input_names, dynamic_axes, output_axes, opset=17):
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+
+    with torch.no_grad():
+        torch.onnx.export(module.eval(), args, output + ".tmp", input_names=input_names, output_names=["output"], dynamic_axes={**dynamic_axes, "output": output_axes}, opset_version=opset, do_constant_folding=True)
+
+    os.replace(output + ".tmp", output)
+    print(f"[INFO] Exported {output}")
+
+    return output
+
+def export_synthesizer(net_g, output, frames=200):
+    net_g = net_g.float().cpu()
+    phone = torch.randn(1, frames, net_g.enc_p.emb_phone.in_features)
+    args, input_names = [phone, torch.LongTensor([frames]), torch.LongTensor([0]), torch.randn(1, net_g.inter_channels, frames)], ["phone", "phone_lengths", "sid", "rnd"]
+    kwargs = {}
+
+    if net_g.use_f0:
+        kwargs["pitch"] = torch.randint(1, 255, (1, frames))
+        kwargs["pitchf"] = 100 + 300 * torch.rand(1, frames)
+
+    if net_g.enc_p.emb_energy is not None: kwargs["energy"] = torch.rand(1, frames)
+    input_names += list(kwargs.keys())
+
+    dynamic_axes = {name: {0: "batch", 1: "frames"} for name in input_names if name not in ("phone_lengths", "sid", "rnd")}
+    dynamic_axes.update({"phone_lengths": {0: "batch"}, "sid": {0: "batch"}, "rnd": {0: "batch", 2: "frames"}})
+
+    return export(SynthesizerWrapper(net_g), tuple(args) + (kwargs,), output, input_names, dynamic_axes, {0: "batch", 2: "samples"})
+
+def export_embedder(model, output, output_layer):
+    source = torch.randn(1, 16000)
+    return export(EmbedderWrapper(model.float().cpu(), output_layer), (source, torch.zeros_like(source, dtype=torch.bool)), output, ["source", "padding_mask"], {"source": {0: "batch", 1: "samples"}, "padding_mask": {0: "batch", 1: "samples"}}, {0: "batch", 1: "frames"})
+
+def export_rmvpe(model, output):
+    return export(model.float().cpu(), (torch.randn(1, 128, 128),), output, ["mel"], {"mel": {0: "batch", 2: "frames"}}, {0: "batch", 1: "frames"})
+
+class OnnxModule:
+    def __init__(self, path, threads=int(os.environ.get("RVC_ONNX_THREADS", 0))):
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads > 0: options.intra_op_num_threads = threads
+
+        self.path = path
+        self.session = onnxruntime.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.inputs = [i.name for i in self.session.get_inputs()]
+
+    def __call__(self, *args, **kwargs):
+        feeds = dict(zip(self.inputs, args))
+        feeds.update({k: v for k, v in kwargs.items() if k in self.inputs and v is not None})
+
+        reference = next((v for v in feeds.values() if v.is_floating_point()), None)
+        output = torch.from_numpy(self.session.run(None, {k: (v.detach().cpu().float().numpy() if v.is_floating_point() else v.detach().cpu().numpy()) for k, v in feeds.items()})[0])
+
+        return output if reference is None else output.to(device=reference.device, dtype=reference.dtype)
+
+class OnnxSynthesizer:
+    def __init__(self, path, net_g):
+        self.module = OnnxModule(path)
+        self.use_f0 = net_g.use_f0
+        self.inter_channels = net_g.inter_channels
+        self.emb_g = net_g.emb_g
+
+    def infer(self, phone, phone_lengths, pitch=None, nsff0=None, sid=None, energy=None, rate=None):
+        rnd = torch.randn(phone.shape[0], self.inter_channels, phone.shape[1], dtype=torch.float32)
+        o = self.module(phone, phone_lengths.view(-1), sid, rnd, pitch=pitch, pitchf=nsff0, energy=energy)
+
+        if rate is not None:
+            head = int(phone.shape[1] * (1.0 - rate.item()))
+            o = o[..., head * (o.shape[-1] // phone.shape[1]):]
+
+        return o, None, None
+
+class OnnxEmbedder:
+    def __init__(self, embedder_model, model):
+        self.final_proj = model.final_proj
+        self.feature_extractor = model.feature_extractor
+        self.sessions = {}
+
+        for output_layer in (9, 12):
+            path = embedder_path(embedder_model, output_layer)
+            if not is_fresh(path, os.path.join("models", embedder_model + ".pt")): export_embedder(model, path, output_layer)
+            self.sessions[output_layer] = OnnxModule(path)
+
+    def extract_features(self, source, padding_mask=None, output_layer=12):
+        if padding_mask is None: padding_mask = torch.zeros_like(source, dtype=torch.bool)
+        return self.sessions[output_layer](source, padding_mask), padding_mask
+
+def load_synthesizer(model_path, net_g):
+    path = synthesizer_path(model_path)
+    if not is_fresh(path, model_path): export_synthesizer(net_g, path)
+
+    return OnnxSynthesizer(path, net_g)
+
+def load_rmvpe(rmvpe):
+    path = rmvpe_path()
+    if not is_fresh(path, os.path.join("models", "rmvpe.pt")): export_rmvpe(rmvpe.model, path)
+
+    rmvpe.model = OnnxModule(path)
+    return rmvpe
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pth_path", default=None)
+    parser.add_argument("--embedder_model", default=None)
+    parser.add_argument("--rmvpe", action="store_true")
+    args = parser.parse_args()
+
+    from modules import fairseq
+    from modules.config import Config
+    from modules.inference import model_registry
+
+    config = Config(is_half=False, cpu_mode=True)
+
+    if args.pth_path: export_synthesizer(model_registry.load(args.pth_path, config)["net_g"], synthesizer_path(args.pth_path))
+
+    if args.embedder_model:
+        model = fairseq.load_model(os.path.join("models", args.embedder_model + ".pt")).eval()
+        for output_layer in (9, 12):
+            export_embedder(model, embedder_path(args.embedder_model, output_layer), output_layer)
+
+    if args.rmvpe:
+        from modules.rmvpe import RMVPE
+        export_rmvpe(RMVPE(os.path.join("models", "rmvpe.pt"), is_half=False, device="cpu").model, rmvpe_path())
@@ -1,7 +1,6 @@
 import os
 import sys
 import torch
-import faiss
 
 import numpy as np
 import torch.nn.functional as F
@@ -10,6 +9,8 @@ from scipy import signal
 
 sys.path.append(os.getcwd())
 
+from modules import tracing
+from modules.cache import index_cache, feature_cache, file_key
 from modules.generator import Generator
 from modules.rms import RMSEnergyExtractor
 from modules.utils import change_rms, clear_gpu_cache
@@ -17,8 +18,9 @@ from modules.utils import change_rms, clear_gpu_cache
 bh, ah = signal.butter(N=5, Wn=48, btype="high", fs=16000)
 
 class Pipeline:
-    def __init__(self, tgt_sr, config):
-        self.x_pad, self.x_query, self.x_center, self.x_max = config.device_config()
+    def __init__(self, tgt_sr, config, is_half=None):
+        self.is_half = config.is_half if is_half is None else is_half
+        self.x_pad, self.x_query, self.x_center, self.x_max = config.device_config(self.is_half)
         self.sample_rate = 16000
         self.window = 160
         self.t_pad = self.sample_rate * self.x_pad
@@ -30,10 +32,98 @@ class Pipeline:
         self.time_step = self.window / self.sample_rate * 1000
         self.f0_min = 50
         self.f0_max = 1100
+        self.embed_context = 1
         self.device = config.device
-        self.is_half = config.is_half
+        self.backend = config.backend
+        self.quantize = config.quantize
 
-    def voice_conversion(self, model, net_g, sid, audio0, pitch, pitchf, index, big_npy, index_rate, version, protect, energy):
+    def get_f0(self, f0_method, audio_pad, f0_up_key, p_len, hop_length, filter_radius, f0_autotune=False, f0_autotune_strength=1, use_cache=True):
+        if not hasattr(self, "f0_generator"): self.f0_generator = Generator(self.sample_rate, hop_length, self.f0_min, self.f0_max, self.is_half, self.device)
+        self.f0_generator.hop_length = hop_length
+
+        with tracing.stage("f0", method=f0_method, samples=audio_pad.shape[0]):
+            pitch, pitchf = self.f0_generator.calculator(f0_method, audio_pad, f0_up_key, p_len, filter_radius, f0_autotune, f0_autotune_strength, use_cache)
+
+        if self.device == "mps": pitchf = pitchf.astype(np.float32)
+        return torch.tensor(pitch[:p_len], device=self.device).unsqueeze(0).long(), torch.tensor(pitchf[:p_len], device=self.device).unsqueeze(0).float()
+
+    def get_energy(self, audio_pad, p_len):
+        if not hasattr(self, "rms_extract"): self.rms_extract = RMSEnergyExtractor(frame_length=2048, hop_length=self.window, center=True, pad_mode = "reflect").to(self.device).eval()
+
+        with tracing.stage("energy"):
+            energy = self.rms_extract(torch.from_numpy(audio_pad).to(self.device).unsqueeze(0)).cpu().numpy()
+
+        if self.device == "mps": energy = energy.astype(np.float32)
+        return torch.tensor(energy[:p_len], device=self.device).unsqueeze(0).float()
+
+    def feature_key(self, audio, embedder_model, version, dtype, chunk=0):
+        if embedder_model is None or not feature_cache.enabled: return None
+        embedder_model_path = os.path.join("models", embedder_model + ".pt")
+
+        return feature_cache.key(audio, embedder_model, file_key(embedder_model_path) if os.path.exists(embedder_model_path) else None, version, str(dtype), chunk, self.embed_context, self.quantize, self.backend)
+
+    def extract_features(self, model, feats, version, key=None, chunk=0):
+        cached = feature_cache.get(key) if key is not None else None
+        if cached is not None:
+            tracing.count("feature_cache_hits")
+            return torch.from_numpy(np.array(cached)).to(self.device)
+
+        with tracing.stage("embedder", samples=feats.shape[-1]):
+            if chunk > 0 and feats.shape[-1] > (chunk + 2 * self.embed_context) * self.sample_rate: feats = self.extract_features_chunked(model, feats, version, chunk)
+            else:
+                padding_mask = torch.BoolTensor(feats.shape).to(self.device).fill_(False)
+                logits = model.extract_features(**{"source": feats.to(self.device), "padding_mask": padding_mask, "output_layer": 9 if version == "v1" else 12})
+                feats = model.final_proj(logits[0]) if version == "v1" else logits[0]
+
+        if key is not None: feature_cache.put(key, feats.cpu().numpy())
+        return feats
+
+    def extract_features_batch(self, model, sources, version, keys, chunk=0):
+        dtype = torch.float16 if self.is_half else torch.float32
+        feats, pending = [None] * len(sources), []
+
+        for b, (source, key) in enumerate(zip(sources, keys)):
+            cached = feature_cache.get(key) if key is not None else None
+
+            if cached is not None:
+                tracing.count("feature_cache_hits")
+                feats[b] = torch.from_numpy(np.array(cached[0])).to(self.device)
+            elif chunk > 0 or not hasattr(model, "extract_features_batch"): feats[b] = self.extract_features(model, torch.from_numpy(source).to(dtype).view(1, -1), version, key, chunk)[0]
+            else: pending.append(b)
+
+        if pending:
+            with tracing.stage("embedder", samples=sum(sources[b].shape[0] for b in pending), batch=len(pending)):
+                logits = model.extract_features_batch([torch.from_numpy(sources[b]).to(dtype).view(1, -1).to(self.device) for b in pending], output_layer=9 if version == "v1" else 12)
+                outputs = model.final_proj(logits[0]) if version == "v1" else logits[0]
+
+            for i, (b, n_frames) in enumerate(zip(pending, (~logits[1]).sum(-1).tolist())):
+                feats[b] = outputs[i, :n_frames]
+                if keys[b] is not None: feature_cache.put(keys[b], feats[b].unsqueeze(0).cpu().numpy())
+
+        return feats
+
+    def extract_features_chunked(self, model, feats, version, chunk):
+        hop = self.window * 2
+        chunk = max(int(chunk * self.sample_rate) // hop, 1) * hop
+        context = int(self.embed_context * self.sample_rate) // hop * hop
+        length = feats.shape[-1]
+        n_frames = self.feature_lengths(model, [length])[0]
+        outputs = []
+
+        for start in range(0, length, chunk):
+            if start // hop >= n_frames: break
+
+            left, right = max(start - context, 0), min(start + chunk + context + hop, length)
+            source = feats[:, left:right].to(self.device)
+
+            logits = model.extract_features(**{"source": source, "padding_mask": torch.zeros_like(source, dtype=torch.bool), "output_layer": 9 if version == "v1" else 12})
+            outputs.append((model.final_proj(logits[0]) if version == "v1" else logits[0])[:, (start - left) // hop : (start - left + chunk) // hop])
+
+            del source, logits
+
+        return torch.cat(outputs, dim=1)[:, :n_frames]
+
+    def voice_conversion(self, model, net_g, sid, audio0, pitch, pitchf, index, big_npy, index_rate, version, protect, energy, rate=None, embedder_model=None, embed_chunk=0):
         feats = (torch.from_numpy(audio0).half() if self.is_half else torch.from_numpy(audio0).float())
         pitch_guidance = pitch != None and pitchf != None
         energy_use = energy != None
@@ -43,9 +133,7 @@ class Pipeline:
         feats = feats.view(1, -1)
 
         with torch.no_grad():
-            padding_mask = torch.BoolTensor(feats.shape).to(self.device).fill_(False)
-            logits = model.extract_features(**{"source": feats.to(self.device), "padding_mask": padding_mask, "output_layer": 9 if version == "v1" else 12})
-            feats = model.final_proj(logits[0]) if version == "v1" else logits[0]
+            feats = self.extract_features(model, feats, version, self.feature_key(audio0, embedder_model, version, feats.dtype, embed_chunk), embed_chunk)
 
             if protect < 0.5 and pitch_guidance: feats0 = feats.clone()
 
@@ -53,11 +141,12 @@ class Pipeline:
                 npy = feats[0].cpu().numpy()
                 if self.is_half: npy = npy.astype(np.float32)
 
-                score, ix = index.search(npy, k=8)
-                weight = np.square(1 / score)
+                with tracing.stage("index_search", frames=npy.shape[0]):
+                    score, ix = index.search(npy, k=8)
+                    weight = np.square(1 / score)
 
-                npy = np.sum(big_npy[ix] * np.expand_dims(weight / weight.sum(axis=1, keepdims=True), axis=2), axis=1)
-                if self.is_half: npy = npy.astype(np.float16)
+                    npy = np.sum(np.asarray(big_npy[ix], dtype=np.float32) * np.expand_dims(weight / weight.sum(axis=1, keepdims=True), axis=2), axis=1)
+                    if self.is_half: npy = npy.astype(np.float16)
 
                 feats = (torch.from_numpy(npy).unsqueeze(0).to(self.device) * index_rate + (1 - index_rate) * feats)
 
@@ -86,22 +175,110 @@ class Pipeline:
             if not energy_use: energy = None
             else: energy = energy.half() if self.is_half else energy.float()
 
-            audio1 = (
-                (
-                    net_g.infer(
+            with tracing.stage("synthesizer"):
+                audio1 = (
+                    (
+                        net_g.infer(
+                            feats, 
+                            p_len, 
+                            pitch, 
+                            pitchf,
+                            sid,
+                            energy,
+                            None if rate is None else torch.tensor([rate], device=self.device)
+                        )[0][0, 0]
+                    ).data.cpu().float().numpy()
+                )
+
+        del feats, p_len, net_g, model
+        clear_gpu_cache()
+        return audio1
+    
+    def feature_lengths(self, model, lengths):
+        for block in model.feature_extractor.conv_layers:
+            lengths = [(length - block[0].kernel_size[0]) // block[0].stride[0] + 1 for length in lengths]
+
+        return lengths
+
+    def voice_conversion_batch(self, model, net_g, sid, segments, index, big_npy, index_rate, version, protect, batch_size, embedder_model=None, embed_chunk=0):
+        pitch_guidance = segments[0][1] is not None and segments[0][2] is not None
+        energy_use = segments[0][3] is not None
+        order = sorted(range(len(segments)), key=lambda i: segments[i][0].shape[0])
+        outputs = [None] * len(segments)
+
+        for i in range(0, len(order), batch_size):
+            batch = order[i : i + batch_size]
+            lengths = [segments[j][0].shape[0] for j in batch]
+
+            keys = [self.feature_key(segments[j][0], embedder_model, version, torch.float16 if self.is_half else torch.float32, embed_chunk) for j in batch]
+
+            with torch.no_grad():
+                feats = self.extract_features_batch(model, [segments[j][0] for j in batch], version, keys, embed_chunk)
+                n_frames = [feat.shape[0] for feat in feats]
+                feats = torch.nn.utils.rnn.pad_sequence(feats, batch_first=True)
+
+                if protect < 0.5 and pitch_guidance: feats0 = feats.clone()
+
+                if (not isinstance(index, type(None)) and not isinstance(big_npy, type(None)) and index_rate != 0):
+                    npy = torch.cat([feats[b, : n_frames[b]] for b in range(len(batch))]).cpu().numpy()
+                    if self.is_half: npy = npy.astype(np.float32)
+
+                    with tracing.stage("index_search", frames=npy.shape[0]):
+                        score, ix = index.search(npy, k=8)
+                        weight = np.square(1 / score)
+
+                        npy = np.sum(np.asarray(big_npy[ix], dtype=np.float32) * np.expand_dims(weight / weight.sum(axis=1, keepdims=True), axis=2), axis=1)
+                        if self.is_half: npy = npy.astype(np.float16)
+
+                    npy = torch.from_numpy(npy).to(self.device)
+                    offset = 0
+
+                    for b in range(len(batch)):
+                        feats[b, : n_frames[b]] = npy[offset : offset + n_frames[b]] * index_rate + (1 - index_rate) * feats[b, : n_frames[b]]
+                        offset += n_frames[b]
+
+                feats = F.interpolate(feats.permute(0, 2, 1), scale_factor=2).permute(0, 2, 1)
+                if protect < 0.5 and pitch_guidance: feats0 = F.interpolate(feats0.permute(0, 2, 1), scale_factor=2).permute(0, 2, 1)
+
+                p_len = [min(lengths[b] // self.window, n_frames[b] * 2) for b in range(len(batch))]
+                pitch = torch.zeros(len(batch), feats.shape[1], dtype=torch.long, device=self.device) if pitch_guidance else None
+                pitchf = torch.zeros(len(batch), feats.shape[1], device=self.device) if pitch_guidance else None
+                energy = torch.zeros(len(batch), feats.shape[1], device=self.device) if energy_use else None
+
+                for b, j in enumerate(batch):
+                    if pitch_guidance: pitch[b, : p_len[b]], pitchf[b, : p_len[b]] = segments[j][1][0, : p_len[b]], segments[j][2][0, : p_len[b]]
+                    if energy_use: energy[b, : p_len[b]] = segments[j][3][0, : p_len[b]]
+
+                if protect < 0.5 and pitch_guidance:
+                    pitchff = pitchf.clone()
+                    pitchff[pitchf > 0] = 1
+                    pitchff[pitchf < 1] = protect
+                    pitchff = pitchff.unsqueeze(-1)
+
+                    feats = (feats * pitchff + feats0 * (1 - pitchff)).to(feats0.dtype)
+
+                feats = feats.half() if self.is_half else feats.float()
+                if pitch_guidance: pitchf = pitchf.half() if self.is_half else pitchf.float()
+                if energy_use: energy = energy.half() if self.is_half else energy.float()
+
+                with tracing.stage("synthesizer", batch=len(batch)):
+                    audio1 = net_g.infer(
                         feats, 
-                        p_len, 
+                        torch.tensor(p_len, device=self.device).long(), 
                         pitch, 
-                        pitchf,
-                        sid,
+                        pitchf, 
+                        sid.repeat(len(batch)), 
                         energy
-                    )[0][0, 0]
-                ).data.cpu().float().numpy()
-            )
+                    )[0][:, 0].data.cpu().float().numpy()
 
-        del feats, p_len, net_g, model, padding_mask
-        clear_gpu_cache()
-        return audio1
+            upp = audio1.shape[-1] // feats.shape[1]
+            for b, j in enumerate(batch):
+                outputs[j] = audio1[b, : p_len[b] * upp]
+
+            del feats, pitch, pitchf, energy
+            clear_gpu_cache()
+
+        return outputs
     
     def pipeline(
         self, 
@@ -121,92 +298,83 @@ class Pipeline:
         hop_length, 
         energy_use=False,
         f0_autotune=False, 
-        f0_autotune_strength=False
+        f0_autotune_strength=False,
+        batch_size=1,
+        embedder_model=None,
+        embed_chunk=0,
+        normalize=True
     ):
         if file_index != "" and os.path.exists(file_index) and index_rate != 0:
             try:
-                index = faiss.read_index(file_index)
-                big_npy = index.reconstruct_n(0, index.ntotal)
+                with tracing.stage("index_load"):
+                    index, big_npy = index_cache.load(file_index)
             except Exception as e:
                 print(f"[ERROR] Error occurred while reading index file: {e}")
                 index = big_npy = None
         else: index = big_npy = None
 
-        opt_ts, audio_opt = [], []
-        audio = signal.filtfilt(bh, ah, audio)
+        opt_ts = []
+        with tracing.stage("highpass"):
+            audio = signal.filtfilt(bh, ah, audio)
+
         audio_pad = np.pad(audio, (self.window // 2, self.window // 2), mode="reflect")
 
         if audio_pad.shape[0] > self.t_max:
-            audio_sum = np.zeros_like(audio)
+            with tracing.stage("split_points"):
+                audio_sum = np.zeros_like(audio)
 
-            for i in range(self.window):
-                audio_sum += audio_pad[i : i - self.window]
+                for i in range(self.window):
+                    audio_sum += audio_pad[i : i - self.window]
 
-            for t in range(self.t_center, audio.shape[0], self.t_center):
-                opt_ts.append(t - self.t_query + np.where(np.abs(audio_sum[t - self.t_query : t + self.t_query]) == np.abs(audio_sum[t - self.t_query : t + self.t_query]).min())[0][0])
+                for t in range(self.t_center, audio.shape[0], self.t_center):
+                    opt_ts.append(t - self.t_query + np.where(np.abs(audio_sum[t - self.t_query : t + self.t_query]) == np.abs(audio_sum[t - self.t_query : t + self.t_query]).min())[0][0])
 
         s = 0
         t = None
-        audio_pad = np.pad(audio, (self.t_pad, self.t_pad), mode="reflect")
+        with tracing.stage("pad", samples=audio.shape[0]):
+            audio_pad = np.pad(audio, (self.t_pad, self.t_pad), mode="reflect")
+
         sid = torch.tensor(sid, device=self.device).unsqueeze(0).long()
         p_len = audio_pad.shape[0] // self.window
 
-        if pitch_guidance:
-            if not hasattr(self, "f0_generator"): self.f0_generator = Generator(self.sample_rate, hop_length, self.f0_min, self.f0_max, self.is_half, self.device)
-            pitch, pitchf = self.f0_generator.calculator(f0_method, audio_pad, f0_up_key, p_len, filter_radius, f0_autotune, f0_autotune_strength)
+        if pitch_guidance: pitch, pitchf = self.get_f0(f0_method, audio_pad, f0_up_key, p_len, hop_length, filter_radius, f0_autotune, f0_autotune_strength)
+        if energy_use: energy = self.get_energy(audio_pad, p_len)
 
-            if self.device == "mps": pitchf = pitchf.astype(np.float32)
-            pitch, pitchf = torch.tensor(pitch[:p_len], device=self.device).unsqueeze(0).long(), torch.tensor(pitchf[:p_len], device=self.device).unsqueeze(0).float()
-
-        if energy_use:
-            if not hasattr(self, "rms_extract"): self.rms_extract = RMSEnergyExtractor(frame_length=2048, hop_length=self.window, center=True, pad_mode = "reflect").to(self.device).eval()
-            energy = self.rms_extract(torch.from_numpy(audio_pad).to(self.device).unsqueeze(0)).cpu().numpy()
-            
-            if self.device == "mps": energy = energy.astype(np.float32)
-            energy = torch.tensor(energy[:p_len], device=self.device).unsqueeze(0).float()
+        segments = []
 
         for t in opt_ts:
             t = t // self.window * self.window
-            audio_opt.append(
-                self.voice_conversion(
-                    model, 
-                    net_g, 
-                    sid, 
+            segments.append(
+                (
                     audio_pad[s : t + self.t_pad2 + self.window], 
                     pitch[:, s // self.window : (t + self.t_pad2) // self.window] if pitch_guidance else None, 
                     pitchf[:, s // self.window : (t + self.t_pad2) // self.window] if pitch_guidance else None, 
-                    index, 
-                    big_npy, 
-                    index_rate, 
-                    version, 
-                    protect, 
                     energy[:, s // self.window : (t + self.t_pad2) // self.window] if energy_use else None
-                )[self.t_pad_tgt : -self.t_pad_tgt]
-            )    
+                )
+            )
             s = t
-            
-        audio_opt.append(
-            self.voice_conversion(
-                model, 
-                net_g, 
-                sid, 
+
+        segments.append(
+            (
                 audio_pad[t:], 
                 (pitch[:, t // self.window :] if t is not None else pitch) if pitch_guidance else None, 
                 (pitchf[:, t // self.window :] if t is not None else pitchf) if pitch_guidance else None, 
-                index, 
-                big_npy, 
-                index_rate, 
-                version, 
-                protect, 
                 (energy[:, t // self.window :] if t is not None else energy) if energy_use else None
-            )[self.t_pad_tgt : -self.t_pad_tgt]
+            )
         )
 
-        audio_opt = np.concatenate(audio_opt)
+        tracing.count("segments", len(segments))
+        if batch_size > 1 and len(segments) > 1: audio_opt = self.voice_conversion_batch(model, net_g, sid, segments, index, big_npy, index_rate, version, protect, batch_size, embedder_model=embedder_model, embed_chunk=embed_chunk)
+        else: audio_opt = [self.voice_conversion(model, net_g, sid, segment[0], segment[1], segment[2], index, big_npy, index_rate, version, protect, segment[3], embedder_model=embedder_model, embed_chunk=embed_chunk) for segment in segments]
+
+        audio_opt = np.concatenate([audio1[self.t_pad_tgt : -self.t_pad_tgt] for audio1 in audio_opt])
 
-        if volume_envelope != 1: audio_opt = change_rms(audio, self.sample_rate, audio_opt, self.sample_rate, volume_envelope)
-        audio_max = np.abs(audio_opt).max() / 0.99
-        if audio_max > 1: audio_opt /= audio_max
+        if volume_envelope != 1:
+            with tracing.stage("rms_mix"):
+                audio_opt = change_rms(audio, self.sample_rate, audio_opt, self.sample_rate, volume_envelope)
+        if normalize:
+            audio_max = np.abs(audio_opt).max() / 0.99
+            if audio_max > 1: audio_opt /= audio_max
 
         if pitch_guidance: del pitch, pitchf
         del sid
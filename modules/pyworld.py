@@ -26,15 +26,52 @@ class PYWORLD:
                 w.write(model[model_type])
 
         self.world_dll = ctypes.CDLL(self.world_file_path)
+        self.segment_time = float(os.environ.get("RVC_WORLD_SEGMENT", 0))
+        self.workers = int(os.environ.get("RVC_WORLD_THREADS", os.cpu_count() or 1))
+        self.bind()
 
-    def harvest(self, x, fs, f0_floor=50, f0_ceil=1100, frame_period=10):
-        self.world_dll.Harvest.argtypes = [ctypes.POINTER(ctypes.c_double), ctypes.c_int, ctypes.c_int, ctypes.POINTER(HarvestOption), ctypes.POINTER(ctypes.c_double), ctypes.POINTER(ctypes.c_double)]
-        self.world_dll.Harvest.restype = None 
-        self.world_dll.InitializeHarvestOption.argtypes = [ctypes.POINTER(HarvestOption)]
-        self.world_dll.InitializeHarvestOption.restype = None
-        self.world_dll.GetSamplesForHarvest.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_double]
-        self.world_dll.GetSamplesForHarvest.restype = ctypes.c_int
+    def bind(self):
+        double_array = np.ctypeslib.ndpointer(dtype=np.float64, ndim=1, flags="C_CONTIGUOUS")
 
+        for name, option in (("Harvest", HarvestOption), ("Dio", DioOption)):
+            getattr(self.world_dll, name).argtypes = [double_array, ctypes.c_int, ctypes.c_int, ctypes.POINTER(option), double_array, double_array]
+            getattr(self.world_dll, name).restype = None
+            getattr(self.world_dll, f"Initialize{name}Option").argtypes = [ctypes.POINTER(option)]
+            getattr(self.world_dll, f"Initialize{name}Option").restype = None
+
+        for name in ("GetSamplesForHarvest", "GetSamplesForDIO"):
+            getattr(self.world_dll, name).argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_double]
+            getattr(self.world_dll, name).restype = ctypes.c_int
+
+        self.world_dll.StoneMask.argtypes = [double_array, ctypes.c_int, ctypes.c_int, double_array, double_array, ctypes.c_int, double_array]
+        self.world_dll.StoneMask.restype = None
+
+    def segmented(self, func, x, fs, frame_period, segment_time=None, overlap_time=1, workers=None):
+        segment_time = self.segment_time if segment_time is None else segment_time
+        workers = self.workers if workers is None else workers
+
+        x = np.ascontiguousarray(x, dtype=np.float64)
+        if not segment_time or workers < 2 or x.shape[0] < 1.5 * segment_time * fs: return func(x)
+
+        hop = fs * frame_period / 1000
+        n_frames = int(1000 * x.shape[0] / fs / frame_period) + 1
+        step, overlap = max(int(segment_time * 1000 / frame_period), 1), int(np.ceil(overlap_time * 1000 / frame_period))
+
+        def run(first):
+            last = min(first + step, n_frames)
+            lo, hi = max(first - overlap, 0), min(last + overlap, n_frames)
+
+            f0 = func(x[int(round(lo * hop)) : min(int(round(hi * hop)), x.shape[0])])[0]
+            return f0[first - lo : last - lo]
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            f0 = np.concatenate(list(executor.map(run, range(0, n_frames, step))))
+
+        return f0, (np.arange(n_frames) * frame_period / 1000).astype(np.float32)
+
+    def harvest(self, x, fs, f0_floor=50, f0_ceil=1100, frame_period=10, segment_time=None, workers=None):
         option = HarvestOption()
         self.world_dll.InitializeHarvestOption(ctypes.byref(option))
 
@@ -42,21 +79,16 @@ class PYWORLD:
         option.F0Ceil = f0_ceil
         option.FramePeriod = frame_period
 
-        f0_length = self.world_dll.GetSamplesForHarvest(fs, len(x), option.FramePeriod)
-        f0 = (ctypes.c_double * f0_length)()
-        tpos = (ctypes.c_double * f0_length)()
+        def run(x):
+            f0_length = self.world_dll.GetSamplesForHarvest(fs, x.shape[0], option.FramePeriod)
+            f0, tpos = np.zeros(f0_length, dtype=np.float64), np.zeros(f0_length, dtype=np.float64)
 
-        self.world_dll.Harvest((ctypes.c_double * len(x))(*x), len(x), fs, ctypes.byref(option), tpos, f0)
-        return np.array(f0, dtype=np.float32), np.array(tpos, dtype=np.float32)
+            self.world_dll.Harvest(x, x.shape[0], fs, ctypes.byref(option), tpos, f0)
+            return f0.astype(np.float32), tpos.astype(np.float32)
 
-    def dio(self, x, fs, f0_floor=50, f0_ceil=1100, channels_in_octave=2, frame_period=10, speed=1, allowed_range=0.1):
-        self.world_dll.Dio.argtypes = [ctypes.POINTER(ctypes.c_double), ctypes.c_int, ctypes.c_int, ctypes.POINTER(DioOption), ctypes.POINTER(ctypes.c_double), ctypes.POINTER(ctypes.c_double)]
-        self.world_dll.Dio.restype = None  
-        self.world_dll.InitializeDioOption.argtypes = [ctypes.POINTER(DioOption)]
-        self.world_dll.InitializeDioOption.restype = None
-        self.world_dll.GetSamplesForDIO.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_double]
-        self.world_dll.GetSamplesForDIO.restype = ctypes.c_int
+        return self.segmented(run, x, fs, frame_period, segment_time, workers=workers)
 
+    def dio(self, x, fs, f0_floor=50, f0_ceil=1100, channels_in_octave=2, frame_period=10, speed=1, allowed_range=0.1, segment_time=None, workers=None):
         option = DioOption()
         self.world_dll.InitializeDioOption(ctypes.byref(option))
 
@@ -67,18 +99,18 @@ class PYWORLD:
         option.Speed = speed
         option.AllowedRange = allowed_range
 
-        f0_length = self.world_dll.GetSamplesForDIO(fs, len(x), option.FramePeriod)
-        f0 = (ctypes.c_double * f0_length)()
-        tpos = (ctypes.c_double * f0_length)()
+        def run(x):
+            f0_length = self.world_dll.GetSamplesForDIO(fs, x.shape[0], option.FramePeriod)
+            f0, tpos = np.zeros(f0_length, dtype=np.float64), np.zeros(f0_length, dtype=np.float64)
 
-        self.world_dll.Dio((ctypes.c_double * len(x))(*x), len(x), fs, ctypes.byref(option), tpos, f0)
-        return np.array(f0, dtype=np.float32), np.array(tpos, dtype=np.float32)
+            self.world_dll.Dio(x, x.shape[0], fs, ctypes.byref(option), tpos, f0)
+            return f0.astype(np.float32), tpos.astype(np.float32)
 
-    def stonemask(self, x, fs, tpos, f0):
-        self.world_dll.StoneMask.argtypes = [ctypes.POINTER(ctypes.c_double), ctypes.c_int, ctypes.c_int, ctypes.POINTER(ctypes.c_double), ctypes.POINTER(ctypes.c_double), ctypes.c_int, ctypes.POINTER(ctypes.c_double)]
-        self.world_dll.StoneMask.restype = None 
+        return self.segmented(run, x, fs, frame_period, segment_time, workers=workers)
 
-        out_f0 = (ctypes.c_double * len(f0))()
-        self.world_dll.StoneMask((ctypes.c_double * len(x))(*x), len(x), fs, (ctypes.c_double * len(tpos))(*tpos), (ctypes.c_double * len(f0))(*f0), len(f0), out_f0)
+    def stonemask(self, x, fs, tpos, f0):
+        x, tpos, f0 = np.ascontiguousarray(x, dtype=np.float64), np.ascontiguousarray(tpos, dtype=np.float64), np.ascontiguousarray(f0, dtype=np.float64)
+        out_f0 = np.zeros(f0.shape[0], dtype=np.float64)
 
-        return np.array(out_f0, dtype=np.float32)
\ No newline at end of file
+        self.world_dll.StoneMask(x, x.shape[0], fs, tpos, f0, f0.shape[0], out_f0)
+        return out_f0.astype(np.float32)
@@ -0,0 +1,55 @@
+import os
+import sys
+import torch
+
+from torch import nn
+
+sys.path.append(os.getcwd())
+
+from modules.export import remove_parametrizations
+from modules.cache import cache_dir, cache_key, file_key
+
+class PointwiseConv(nn.Module):
+    def __init__(self, conv):
+        super().__init__()
+        self.linear = nn.Linear(conv.in_channels, conv.out_channels, bias=conv.bias is not None)
+        self.linear.weight.data.copy_(conv.weight.data[..., 0])
+        if conv.bias is not None: self.linear.bias.data.copy_(conv.bias.data)
+
+    def forward(self, x):
+        return self.linear(x.transpose(1, 2)).transpose(1, 2)
+
+def convert_pointwise(module):
+    for name, child in module.named_children():
+        if isinstance(child, nn.Conv1d) and child.kernel_size == (1,) and child.stride == (1,) and child.dilation == (1,) and child.groups == 1 and child.padding in ((0,), "valid"): setattr(module, name, PointwiseConv(child))
+        else: convert_pointwise(child)
+
+    return module
+
+def quantize(module, dtype=torch.qint8):
+    module = convert_pointwise(remove_parametrizations(module.float().cpu().eval()))
+
+    for child in module.modules():
+        if hasattr(child, "skip_embed_dim_check"): child.skip_embed_dim_check = True
+
+    return torch.ao.quantization.quantize_dynamic(module, {nn.Linear}, dtype=dtype)
+
+def load_quantized(source, build, name, code=()):
+    path = os.path.join(cache_dir, "quantized", cache_key(file_key(source), name, torch.__version__, *[file_key(file) for file in code]) + ".pt")
+
+    if os.path.exists(path):
+        try:
+            return torch.load(path, map_location="cpu", weights_only=False)
+        except Exception as e:
+            print(f"[WARNING] Could not load quantized cache {path}: {e}")
+
+    module = quantize(build())
+
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        torch.save(module, path + f".{os.getpid()}.tmp")
+        os.replace(path + f".{os.getpid()}.tmp", path)
+    except OSError as e:
+        print(f"[WARNING] Could not write quantized cache {path}: {e}")
+
+    return module
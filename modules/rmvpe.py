@@ -186,7 +186,7 @@ class MelSpectrogram(torch.nn.Module):
         return torch.log(torch.clamp(mel_output, min=self.clamp))
 
 class RMVPE:
-    def __init__(self, model_path, is_half, device=None):
+    def __init__(self, model_path, is_half, device=None, chunk_time=float(os.environ.get("RVC_RMVPE_CHUNK", 0)), overlap_time=float(os.environ.get("RVC_RMVPE_OVERLAP", 0.5)), batch_size=int(os.environ.get("RVC_RMVPE_BATCH", 4))):
         self.resample_kernel = {}
         self.resample_kernel = {}
         model = E2E(4, 1, (2, 2))
@@ -200,16 +200,43 @@ class RMVPE:
         self.mel_extractor = MelSpectrogram(is_half, N_MELS, 16000, 1024, 160, None, 30, 8000).to(device)
         cents_mapping = 20 * np.arange(N_CLASS) + 1997.3794084376191
         self.cents_mapping = np.pad(cents_mapping, (4, 4))
+        self.chunk_size = 32 * max(1, round(chunk_time * 100 / 32)) if chunk_time > 0 else 0
+        self.overlap_size = min(int(overlap_time * 100), self.chunk_size // 2)
+        self.batch_size = max(1, batch_size)
 
     def mel2hidden(self, mel):
         with torch.no_grad():
             n_frames = mel.shape[-1]
+            if self.chunk_size and n_frames > self.chunk_size: return self.chunked_hidden(mel)
+
             n_pad = 32 * ((n_frames - 1) // 32 + 1) - n_frames
             if n_pad > 0: mel = F.pad(mel, (0, n_pad), mode="constant")
 
             hidden = self.model(mel.half() if self.is_half else mel.float())
             return hidden[:, :n_frames]
 
+    def chunked_hidden(self, mel):
+        n_frames, chunk, overlap = mel.shape[-1], self.chunk_size, self.overlap_size
+        starts = list(range(0, n_frames - chunk, chunk - overlap)) + [n_frames - chunk]
+
+        fade_in = torch.arange(1, overlap + 1, dtype=torch.float32) / (overlap + 1)
+        hidden, weight = torch.zeros(n_frames, N_CLASS), torch.zeros(n_frames, 1)
+
+        for i in range(0, len(starts), self.batch_size):
+            batch = starts[i : i + self.batch_size]
+            windows = torch.stack([mel[0, :, start : start + chunk] for start in batch])
+            output = self.model(windows.half() if self.is_half else windows.float()).float().cpu()
+
+            for start, window in zip(batch, output):
+                w = torch.ones(chunk, 1)
+                if start > 0: w[:overlap, 0] = fade_in
+                if start + chunk < n_frames: w[chunk - overlap :, 0] = fade_in.flip(0)
+
+                hidden[start : start + chunk] += window * w
+                weight[start : start + chunk] += w
+
+        return (hidden / weight).unsqueeze(0)
+
     def decode(self, hidden, thred=0.03):
         f0 = 10 * (2 ** (self.to_local_average_cents(hidden, thred=thred) / 1200))
         f0[f0 == 10] = 0
@@ -230,20 +257,11 @@ class RMVPE:
         return f0
 
     def to_local_average_cents(self, salience, thred=0.05):
-        center = np.argmax(salience, axis=1)
-        salience = np.pad(salience, ((0, 0), (4, 4)))
-        center += 4
-        todo_salience, todo_cents_mapping = [], []
-        starts = center - 4
-        ends = center + 5
-
-        for idx in range(salience.shape[0]):
-            todo_salience.append(salience[:, starts[idx] : ends[idx]][idx])
-            todo_cents_mapping.append(self.cents_mapping[starts[idx] : ends[idx]])
-
-        todo_salience = np.array(todo_salience)
-        devided = np.sum(todo_salience * np.array(todo_cents_mapping), 1) / np.sum(todo_salience, 1)
-        devided[np.max(salience, axis=1) <= thred] = 0
+        index = np.argmax(salience, axis=1)[:, None] + np.arange(-4, 5)
+        todo_salience = np.where((index >= 0) & (index < N_CLASS), np.take_along_axis(salience, np.clip(index, 0, N_CLASS - 1), axis=1), 0)
+
+        devided = np.sum(todo_salience * self.cents_mapping[index + 4], 1) / np.sum(todo_salience, 1)
+        devided[np.maximum(np.max(salience, axis=1), 0) <= thred] = 0
 
         return devided
 
@@ -0,0 +1,119 @@
+import os
+import sys
+import soxr
+import torch
+
+import numpy as np
+
+from scipy import signal
+
+sys.path.append(os.getcwd())
+
+from modules.cache import index_cache
+from modules.pipeline import bh, ah
+
+class StreamingVoiceConverter:
+    def __init__(self, cvt, embedder_model="contentvec_base", pitch=0, f0_method="rmvpe", index_path="", index_rate=0.5, protect=0.5, hop_length=160, filter_radius=3, f0_autotune=False, f0_autotune_strength=1, sample_rate=16000, block_time=0.25, crossfade_time=0.05, extra_time=2.0, sola_search_time=0.01):
+        self.cvt = cvt
+        self.vc = cvt.vc
+        self.pitch = pitch
+        self.f0_method = f0_method
+        self.index_rate = index_rate
+        self.protect = protect
+        self.hop_length = hop_length
+        self.filter_radius = filter_radius
+        self.f0_autotune = f0_autotune
+        self.f0_autotune_strength = f0_autotune_strength
+        self.sample_rate = sample_rate
+        self.tgt_sr = cvt.tgt_sr
+        self.window = self.vc.window
+        self.zc = self.tgt_sr // 100
+        self.block_frames = max(1, round(block_time * 16000 / self.window))
+        self.crossfade_frames = max(1, round(crossfade_time * 16000 / self.window))
+        self.sola_search_frames = max(1, round(sola_search_time * 16000 / self.window))
+        self.extra_frames = max(1, round(extra_time * 16000 / self.window))
+        self.return_frames = self.block_frames + self.crossfade_frames + self.sola_search_frames
+        self.total_frames = self.extra_frames + self.return_frames
+        self.block_size = self.block_frames * self.window * sample_rate // 16000
+        self.crossfade = self.crossfade_frames * self.zc
+        self.sola_search = self.sola_search_frames * self.zc
+        self.fade_in = np.sin(0.5 * np.pi * np.linspace(0, 1, self.crossfade)) ** 2
+        self.fade_out = 1 - self.fade_in
+
+        cvt.load_embedder(embedder_model)
+        index_path = index_path.strip().strip('"').strip("\n").strip('"').strip().replace("trained", "added")
+
+        if index_path != "" and os.path.exists(index_path) and index_rate != 0:
+            try:
+                self.index, self.big_npy = index_cache.load(index_path)
+            except Exception as e:
+                print(f"[ERROR] Error occurred while reading index file: {e}")
+                self.index = self.big_npy = None
+        else: self.index = self.big_npy = None
+
+        self.sid = torch.tensor(cvt.sid, device=self.vc.device).unsqueeze(0).long()
+        self.reset()
+
+    @property
+    def latency(self):
+        return self.return_frames * self.window / 16000
+
+    def reset(self):
+        self.input_buffer = np.zeros(self.total_frames * self.window, dtype=np.float32)
+        self.sola_buffer = np.zeros(self.crossfade, dtype=np.float32)
+        self.resampler = soxr.ResampleStream(self.sample_rate, 16000, 1, dtype="float32", quality="HQ") if self.sample_rate != 16000 else None
+        self.pending = np.zeros(0, dtype=np.float32)
+
+    def process(self, block):
+        block = np.asarray(block, dtype=np.float32)
+        if block.ndim > 1: block = block.mean(-1)
+        if self.resampler is not None: block = self.resampler.resample_chunk(block)
+
+        self.pending = np.concatenate([self.pending, block])
+        step = self.block_frames * self.window
+        outputs = []
+
+        while self.pending.shape[0] >= step:
+            self.input_buffer = np.concatenate([self.input_buffer[step:], self.pending[:step]])
+            self.pending = self.pending[step:]
+            outputs.append(self.convert())
+
+        return np.concatenate(outputs) if outputs else np.zeros(0, dtype=np.float32)
+
+    def convert(self):
+        audio = signal.filtfilt(bh, ah, self.input_buffer)
+        p_len = audio.shape[0] // self.window
+
+        pitch, pitchf = self.vc.get_f0(self.f0_method, audio, self.pitch, p_len, self.hop_length, self.filter_radius, self.f0_autotune, self.f0_autotune_strength, use_cache=False) if self.cvt.use_f0 else (None, None)
+        energy = self.vc.get_energy(audio, p_len) if self.cvt.energy else None
+
+        audio1 = self.vc.voice_conversion(
+            self.cvt.hubert_model,
+            self.cvt.net_g,
+            self.sid,
+            audio,
+            pitch,
+            pitchf,
+            self.index,
+            self.big_npy,
+            self.index_rate,
+            self.cvt.version,
+            self.protect,
+            energy,
+            rate=min((self.return_frames + 2) / self.total_frames, 1.0)
+        )
+
+        infer_wav = audio1[-(self.return_frames * self.zc):]
+        conv_input = infer_wav[: self.crossfade + self.sola_search]
+
+        cor_nom = np.convolve(conv_input, self.sola_buffer[::-1], mode="valid")
+        cor_den = np.sqrt(np.convolve(conv_input ** 2, np.ones(self.crossfade), mode="valid") + 1e-8)
+        offset = int(np.argmax(cor_nom / cor_den))
+
+        infer_wav = infer_wav[offset:].copy()
+        infer_wav[: self.crossfade] = infer_wav[: self.crossfade] * self.fade_in + self.sola_buffer * self.fade_out
+
+        block_size = self.block_frames * self.zc
+        self.sola_buffer = infer_wav[block_size : block_size + self.crossfade].copy()
+
+        return infer_wav[:block_size].astype(np.float32)
\ No newline at end of file
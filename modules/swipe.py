@@ -48,73 +48,105 @@ def swipe(x, fs, f0_floor=50, f0_ceil=1100, frame_period=10, sTHR=0.3):
         mu[k] = 1 - np.abs(d[j[k]] - i - 1)
         S[j, :] = S[j, :] + np.tile(mu.reshape(-1, 1), (1, Si.shape[1])) * Si
 
+    return np.array(refine_peaks(S, pc, sTHR), dtype=np.float32), np.array(t, dtype=np.float32)
 
-    p = np.full((S.shape[1], 1), np.nan)
-    s = np.full((S.shape[1], 1), np.nan)
+def round_matlab(n):
+    return int(Decimal(n).quantize(0, ROUND_HALF_UP))
 
-    for j in range(S.shape[1]):
-        s[j] = np.max(S[:, j])
-        i = np.argmax(S[:, j])
+def refine_peaks(S, pc, sTHR):
+    s = np.max(S, axis=0)
+    i = np.argmax(S, axis=0)
 
-        if s[j] < sTHR: continue
+    p = np.full(S.shape[1], np.nan)
+    voiced = ~(s < sTHR)
 
-        if i == 0: p[j] = pc[0]
-        elif i == len(pc) - 1: p[j] = pc[0]
-        else:
-            I = np.arange(i-1, i+2)
-            tc = 1 / pc[I]
+    edge = voiced & ((i == 0) | (i == len(pc) - 1))
+    p[edge] = pc[0]
+
+    frames = np.where(voiced & ~edge)[0]
+    I = i[frames, None] + np.arange(-1, 2)
+    values = S[I, frames[:, None]]
 
-            ntc = (tc / tc[1] - 1) * 2 * np.pi
-            idx = np.isfinite(S[I, j])
+    finite = np.isfinite(values).all(axis=1)
+    for j in frames[~finite]:
+        p[j] = refine_frame(S, pc, j, i[j])
 
-            c = np.zeros(len(ntc))
-            c += np.nan
-            
-            I_ = I[idx]
+    if finite.any(): p[frames[finite]] = parabolic_peaks(pc, I[finite], values[finite])
+    p[np.isnan(p)] = 0
 
-            if len(I_) < 2: c[idx] = (S[I, j])[0] / ntc[0]
-            else: c[idx] = np.polyfit(ntc[idx], (S[I_, j]), 2)
+    return p
 
-            pval = np.polyval(c, ((1 / (2 ** np.arange(np.log2(pc[I[0]]), np.log2(pc[I[2]]) + 1 / 12 / 64, 1 / 12 / 64))) / tc[1] - 1) * 2 * np.pi)
-            s[j] = np.max(pval)
-            p[j] = 2 ** (np.log2(pc[I[0]]) + (np.argmax(pval)) / 12 / 64)
+def parabolic_peaks(pc, I, values):
+    tc = 1 / pc[I]
+    ntc = (tc / tc[:, 1:2] - 1) * 2 * np.pi
+    c = np.linalg.solve(np.stack([ntc ** 2, ntc, np.ones_like(ntc)], axis=-1), values[..., None])[..., 0]
 
-    p = p.flatten()
-    p[np.isnan(p)] = 0
+    step = 1 / 12 / 64
+    start = np.log2(pc[I[:, 0]])
+    length = np.ceil((np.log2(pc[I[:, 2]]) + step - start) / step).astype(int)
 
-    return np.array(p, dtype=np.float32), np.array(t, dtype=np.float32)
+    log2p = start[:, None] + np.arange(length.max()) * ((start + step) - start)[:, None]
+    x = ((1 / (2 ** log2p)) / tc[:, 1:2] - 1) * 2 * np.pi
 
-def round_matlab(n):
-    return int(Decimal(n).quantize(0, ROUND_HALF_UP))
+    pval = (c[:, :1] * x + c[:, 1:2]) * x + c[:, 2:]
+    pval[np.arange(x.shape[1]) >= length[:, None]] = -np.inf
+
+    return 2 ** (start + np.argmax(pval, axis=1) / 12 / 64)
+
+def refine_frame(S, pc, j, i):
+    I = np.arange(i - 1, i + 2)
+    tc = 1 / pc[I]
+
+    ntc = (tc / tc[1] - 1) * 2 * np.pi
+    idx = np.isfinite(S[I, j])
+
+    c = np.zeros(len(ntc))
+    c += np.nan
+
+    I_ = I[idx]
+
+    if len(I_) < 2: c[idx] = (S[I, j])[0] / ntc[0]
+    else: c[idx] = np.polyfit(ntc[idx], (S[I_, j]), 2)
+
+    pval = np.polyval(c, ((1 / (2 ** np.arange(np.log2(pc[I[0]]), np.log2(pc[I[2]]) + 1 / 12 / 64, 1 / 12 / 64))) / tc[1] - 1) * 2 * np.pi)
+    return 2 ** (np.log2(pc[I[0]]) + (np.argmax(pval)) / 12 / 64)
 
 def pitchStrengthAllCandidates(f, L, pc):
     den = np.sqrt(np.sum(L * L, axis=0))
     den = np.where(den == 0, 2.220446049250313e-16, den)
 
-    L = L / den
-    S = np.zeros((len(pc), L.shape[1]))
+    limits = np.fix(f[-1] / pc - 0.75).astype(np.int64)
+    prime, square = prime_table(max(int(limits.max()), 1))
+
+    return candidate_kernels(f, pc, limits, prime, square) @ (L / den)
+
+@nb.jit(nopython=True, cache=True)
+def candidate_kernels(f, pc, limits, prime, square):
+    K = np.zeros((len(pc), len(f)))
 
     for j in range(len(pc)):
-        S[j,:] = pitchStrengthOneCandidate(f, L, pc[j])
+        n = limits[j]
+        norm = 0.0
 
-    return S
+        for m in range(len(f)):
+            q = f[m] / pc[j]
+            lower = int(np.floor(q))
+            k = 0.0
 
-def pitchStrengthOneCandidate(f, L, pc):
-    k = np.zeros(len(f)) 
-    q = f / pc 
+            for i in (lower, lower + 1):
+                if i != 1 and (i < 2 or i > n or not (prime[i] or (i == n and square[i]))): continue
 
-    for i in ([1] + sieve(int(np.fix(f[-1] / pc - 0.75)))):
-        a = np.abs(q - i)
-        p = a < 0.25
-        k[p] = np.cos(2 * np.pi * q[p])
+                a = abs(q - i)
+                if a < 0.25: k = np.cos(2 * np.pi * q)
+                elif 0.25 < a and a < 0.75: k += np.cos(2 * np.pi * q) / 2
 
-        v = np.logical_and((0.25 < a), (a < 0.75))
-        k[v] = k[v] + np.cos(2 * np.pi * q[v]) / 2
+            k *= np.sqrt(1 / f[m])
+            K[j, m] = k
+            if k > 0: norm += k * k
 
-    k *= np.sqrt(1 / f)
-    k /= np.linalg.norm(k[k>0])
+        K[j] /= np.sqrt(norm)
 
-    return k @ L
+    return K
 
 def hz2erbs(hz):
     return 21.4 * np.log10(1 + hz / 229)
@@ -122,73 +154,76 @@ def hz2erbs(hz):
 def erbs2hz(erbs):
     return (10 ** (erbs / 21.4) - 1) * 229
 
-def sieve(n):
-    primes = list(range(2, n + 1))
-    num = 2
+def prime_table(n):
+    prime = np.ones(n + 1, dtype=bool)
+    prime[:2] = False
 
-    while num < math.sqrt(n):
-        i = num
+    for i in range(2, math.isqrt(n) + 1):
+        if prime[i]: prime[i * i :: i] = False
 
-        while i <= n:
-            i += num
+    square = np.zeros(n + 1, dtype=bool)
+    square[np.where(prime[: math.isqrt(n) + 1])[0] ** 2] = True
 
-            if i in primes: primes.remove(i)
-                
-        for j in primes:
-            if j > num:
-                num = j
-                break
+    return prime, square
 
-    return primes
+def sieve(n):
+    if n < 2: return []
+    prime, square = prime_table(n)
 
-def stonemask(x, fs, temporal_positions, f0):
+    return np.where(prime)[0].tolist() + ([n] if square[n] else [])
+
+def stonemask(x, fs, temporal_positions, f0, batch_size=256):
     refined_f0 = np.copy(f0)
+    frames = np.where(f0 != 0)[0]
+    half_window_length = np.ceil(3 * fs / f0[frames].astype(np.float64) / 2)
+
+    for length in np.unique(half_window_length):
+        group = frames[half_window_length == length]
+
+        for start in range(0, len(group), batch_size):
+            i = group[start : start + batch_size]
+            refined_f0[i] = get_refined_f0(x, fs, temporal_positions[i], f0[i], length)
 
-    for i in range(len(temporal_positions)):
-        if f0[i] != 0:
-            refined_f0[i] = get_refined_f0(x, fs, temporal_positions[i], f0[i])
-            if abs(refined_f0[i] - f0[i]) / f0[i] > 0.2: refined_f0[i] = f0[i]
+    refined = refined_f0[frames]
+    refined_f0[frames] = np.where(abs(refined - f0[frames]) / f0[frames] > 0.2, f0[frames], refined)
 
     return np.array(refined_f0, dtype=np.float32)
 
-def get_refined_f0(x, fs, current_time, current_f0):
-    f0_initial = current_f0
-    half_window_length = np.ceil(3 * fs / f0_initial / 2)
+def get_refined_f0(x, fs, current_time, current_f0, half_window_length):
+    f0_initial = current_f0[:, None]
     window_length_in_time = (2 * half_window_length + 1) / fs
 
     base_time = np.arange(-half_window_length, half_window_length + 1) / fs
     fft_size = 2 ** math.ceil(math.log((half_window_length * 2 + 1), 2) + 1)
 
     base_time = np.array([float("{0:.4f}".format(elm)) for elm in base_time])
-    index_raw = round_matlab_2((current_time + base_time) * fs)
-    
-    window_time = ((index_raw - 1) / fs) - current_time
+    index_raw = round_matlab_2(((current_time[:, None] + base_time) * fs).ravel()).reshape(len(current_time), -1)
+
+    window_time = ((index_raw - 1) / fs) - current_time[:, None]
     main_window = 0.42 + 0.5 * np.cos(2 * math.pi * window_time / window_length_in_time) + 0.08 * np.cos(4 * math.pi * window_time / window_length_in_time)
-    
+
     index = np.array(np.maximum(1, np.minimum(len(x), index_raw)), dtype=int)
     spectrum = np.fft.fft(x[index - 1] * main_window, fft_size)
 
-    diff_spectrum = np.fft.fft(x[index - 1] * (-(np.diff(np.r_[0, main_window]) + np.diff(np.r_[main_window, 0])) / 2), fft_size)
+    diff_spectrum = np.fft.fft(x[index - 1] * (-(np.diff(np.pad(main_window, ((0, 0), (1, 0))), axis=1) + np.diff(np.pad(main_window, ((0, 0), (0, 1))), axis=1)) / 2), fft_size)
     power_spectrum = np.abs(spectrum) ** 2
 
     from sys import float_info
 
     power_spectrum[power_spectrum == 0] = float_info.epsilon
     instantaneous_frequency = (np.arange(fft_size) / fft_size * fs) + (np.real(spectrum) * np.imag(diff_spectrum) - np.imag(spectrum) * np.real(diff_spectrum)) / power_spectrum * fs / 2 / math.pi
-    
-    trim_index = np.array([1, 2])
-    index_list_trim = np.array(round_matlab_2(f0_initial * fft_size / fs * trim_index) + 1, int)
 
-    amp_list = np.sqrt(power_spectrum[index_list_trim - 1])
-    f0_initial = np.sum(amp_list * instantaneous_frequency[index_list_trim - 1]) / np.sum(amp_list * trim_index)
+    rows = np.arange(len(current_time))[:, None]
+    f0_initial = harmonic_mean_frequency(power_spectrum, instantaneous_frequency, rows, f0_initial, fft_size, fs, np.array([1, 2]))
+    refined = harmonic_mean_frequency(power_spectrum, instantaneous_frequency, rows, np.maximum(f0_initial, 0)[:, None], fft_size, fs, np.array([1, 2, 3, 4, 5, 6]))
 
-    if f0_initial < 0: return 0
-    
-    trim_index = np.array([1, 2, 3, 4, 5, 6])
-    index_list_trim = np.array(round_matlab_2(f0_initial * fft_size / fs * trim_index) + 1, int)
-    amp_list = np.sqrt(power_spectrum[index_list_trim - 1])
+    return np.where(f0_initial < 0, 0, refined)
+
+def harmonic_mean_frequency(power_spectrum, instantaneous_frequency, rows, f0_initial, fft_size, fs, trim_index):
+    index_list_trim = np.array(round_matlab_2((f0_initial * fft_size / fs * trim_index).ravel()) + 1, int).reshape(len(rows), -1)
+    amp_list = np.sqrt(power_spectrum[rows, index_list_trim - 1])
 
-    return np.sum(amp_list * instantaneous_frequency[index_list_trim - 1]) / np.sum(amp_list * trim_index)
+    return np.sum(amp_list * instantaneous_frequency[rows, index_list_trim - 1], axis=1) / np.sum(amp_list * trim_index, axis=1)
 
 @nb.jit((nb.float64[:],), nopython=True, cache=True)
 def round_matlab_2(x):
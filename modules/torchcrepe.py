@@ -1,7 +1,6 @@
 import torch
 import librosa
 import functools
-import scipy.stats
 
 import numpy as np
 
@@ -43,6 +42,56 @@ def median(signals, win_length):
 
     return median_pooled.squeeze(1)
 
+def transition_matrix(band=12):
+    xx, yy = np.meshgrid(range(PITCH_BINS), range(PITCH_BINS))
+    transition = np.maximum(band - abs(xx - yy), 0)
+
+    return transition / transition.sum(axis=1, keepdims=True)
+
+@functools.lru_cache(maxsize=8)
+def banded_transition(dtype, device, band=12):
+    epsilon = np.finfo(np.dtype(dtype)).tiny
+    log_trans = np.log(transition_matrix(band) + epsilon)
+
+    width = band - 1
+    j, k = np.meshgrid(np.arange(PITCH_BINS), np.arange(-width, width + 1), indexing="ij")
+    i = j + k
+
+    weights = np.where((i >= 0) & (i < PITCH_BINS), log_trans[np.clip(i, 0, PITCH_BINS - 1), j], -np.inf)
+    return torch.tensor(weights, dtype=torch.float64, device=device), float(np.log(np.float64(epsilon))), float(np.log(1 / PITCH_BINS + epsilon)), width
+
+def viterbi(probs, band=12):
+    device = probs.device if probs.device.type in ("cpu", "cuda") else torch.device("cpu")
+    weights, out_of_band, log_p_init, width = banded_transition(str(probs.dtype).replace("torch.", ""), device, band)
+
+    batch, _, n_steps = probs.shape
+    log_prob = torch.log(probs.to(device) + torch.finfo(probs.dtype).tiny).double()
+    states = torch.arange(PITCH_BINS, device=device)
+
+    value = log_prob[:, :, 0] + log_p_init
+    ptr = torch.zeros((n_steps, batch, PITCH_BINS), dtype=torch.int16, device=device)
+
+    for t in range(1, n_steps):
+        band_value, band_index = (torch.nn.functional.pad(value, (width, width), value=-float("inf")).unfold(1, 2 * width + 1, 1) + weights).max(dim=-1)
+        band_index = band_index + states - width
+
+        best, best_index = value.max(dim=-1, keepdim=True)
+        best = best + out_of_band
+        jump = ((best_index - states).abs() > width) & ((best > band_value) | ((best == band_value) & (best_index < band_index)))
+
+        ptr[t] = torch.where(jump, best_index, band_index)
+        value = torch.where(jump, best, band_value) + log_prob[:, :, t]
+
+    ptr = ptr.cpu().numpy()
+    path = np.zeros((batch, n_steps), dtype=np.int64)
+    path[:, -1] = value.argmax(dim=-1).cpu().numpy()
+    rows = np.arange(batch)
+
+    for t in range(n_steps - 2, -1, -1):
+        path[:, t] = ptr[t + 1, rows, path[:, t + 1]]
+
+    return torch.from_numpy(path).to(probs.device)
+
 class CREPE_MODEL(torch.nn.Module):
     def __init__(self, model='full'):
         super().__init__()
@@ -105,25 +154,23 @@ class CREPE:
         if str(bins.device).startswith("ocl"): bins = bins.to(torch.float32)
 
         cents = CENTS_PER_BIN * bins + 1997.3794084376191
-        return 10 * 2 ** ((cents + cents.new_tensor(scipy.stats.triang.rvs(c=0.5, loc=-CENTS_PER_BIN, scale=2 * CENTS_PER_BIN, size=cents.size()))) / 1200)
+        dither = (torch.rand(cents.size(), device=cents.device) + torch.rand(cents.size(), device=cents.device) - 1) * CENTS_PER_BIN
+
+        return 10 * 2 ** ((cents + dither.to(cents.dtype)) / 1200)
 
     def frequency_to_bins(self, frequency, quantize_fn=torch.floor):
         return quantize_fn(((1200 * torch.log2(frequency / 10)) - 1997.3794084376191) / CENTS_PER_BIN).int()
 
     def viterbi(self, logits):
-        if not hasattr(self, 'transition'):
-            xx, yy = np.meshgrid(range(360), range(360))
-            transition = np.maximum(12 - abs(xx - yy), 0)
-            self.transition = transition / transition.sum(axis=1, keepdims=True)
-
         with torch.no_grad():
             probs = torch.nn.functional.softmax(logits, dim=1)
+            bins = viterbi(probs)
 
-        bins = torch.tensor(np.array([librosa.sequence.viterbi(sequence, self.transition).astype(np.int64) for sequence in probs.cpu().numpy()]), device=probs.device)
         return bins, self.bins_to_frequency(bins)
     
-    def preprocess(self, audio, pad=True):
-        hop_length = (self.sample_rate // 100) if self.hop_length is None else self.hop_length
+    def preprocess(self, audio, pad=True, hop_length=None, batch_size=None):
+        hop_length = self.hop_length if hop_length is None else hop_length
+        hop_length = (self.sample_rate // 100) if hop_length is None else hop_length
 
         if self.sample_rate != SAMPLE_RATE:
             audio = torch.tensor(librosa.resample(audio.detach().cpu().numpy().squeeze(0), orig_sr=self.sample_rate, target_sr=SAMPLE_RATE, res_type="soxr_vhq"), device=audio.device).unsqueeze(0)
@@ -134,7 +181,8 @@ class CREPE:
             audio = torch.nn.functional.pad(audio, (WINDOW_SIZE // 2, WINDOW_SIZE // 2))
         else: total_frames = 1 + int((audio.size(1) - WINDOW_SIZE) // hop_length)
 
-        batch_size = total_frames if self.batch_size is None else self.batch_size
+        batch_size = self.batch_size if batch_size is None else batch_size
+        batch_size = total_frames if batch_size is None else batch_size
 
         for i in range(0, total_frames, batch_size):
             frames = torch.nn.functional.unfold(audio[:, None, None, max(0, i * hop_length):min(audio.size(1), (i + batch_size - 1) * hop_length + WINDOW_SIZE)], kernel_size=(1, WINDOW_SIZE), stride=(1, hop_length))
@@ -165,10 +213,10 @@ class CREPE:
         if not self.return_periodicity: return pitch
         return pitch, self.periodicity(probabilities, bins)
 
-    def compute_f0(self, audio, pad=True):
+    def compute_f0(self, audio, pad=True, hop_length=None, batch_size=None):
         results = []
 
-        for frames in self.preprocess(audio, pad):
+        for frames in self.preprocess(audio, pad, hop_length, batch_size):
             with torch.no_grad():
                 model = self.model(
                     frames, 
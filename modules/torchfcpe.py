@@ -940,9 +940,9 @@ class FCPE:
         self.dtype = dtype
         self.legacy = legacy
 
-    def compute_f0(self, wav, p_len=None):
+    def compute_f0(self, wav, p_len=None, hop_length=None):
         x = torch.FloatTensor(wav).to(self.dtype).to(self.device)
-        p_len = (x.shape[0] // self.hop_length) if p_len is None else p_len
+        p_len = (x.shape[0] // (self.hop_length if hop_length is None else hop_length)) if p_len is None else p_len
 
         f0 = self.fcpe(x, sr=self.sample_rate, threshold=self.threshold, p_len=p_len)
         f0 = f0[:] if f0.dim() == 1 else f0[0, :, 0]
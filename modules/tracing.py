@@ -0,0 +1,237 @@
+import os
+import sys
+import json
+import time
+import threading
+import contextlib
+import tracemalloc
+
+sys.path.append(os.getcwd())
+
+null = contextlib.nullcontext()
+
+class Stage:
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        if self.tracer.memory is not None: self.tracer.memory.enter(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        torch = sys.modules.get("torch")
+        if torch is not None and torch.cuda.is_available() and torch.cuda.is_initialized(): torch.cuda.synchronize()
+
+        end = time.perf_counter()
+        usage = self.tracer.memory.exit(self) if self.tracer.memory is not None else None
+
+        self.tracer.add(self.name, self.start, end, self.args, usage)
+        return False
+
+def physical_memory():
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+def current_rss():
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except Exception:
+        return None
+
+class MemoryProfiler:
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.active = []
+        self.stopped = threading.Event()
+        self.started_tracemalloc = not tracemalloc.is_tracing()
+        if self.started_tracemalloc: tracemalloc.start()
+
+        self.thread = threading.Thread(target=self.sample, daemon=True)
+        self.thread.start()
+
+    def cuda(self):
+        torch = sys.modules.get("torch")
+        return torch if torch is not None and torch.cuda.is_available() and torch.cuda.is_initialized() else None
+
+    def fold(self):
+        python_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.reset_peak()
+
+        torch = self.cuda()
+        cuda_peak = torch.cuda.max_memory_allocated() if torch is not None else 0
+        if torch is not None: torch.cuda.reset_peak_memory_stats()
+
+        rss = current_rss() or 0
+
+        for stage in self.active:
+            stage.memory["python_peak"] = max(stage.memory["python_peak"], python_peak)
+            stage.memory["cuda_peak"] = max(stage.memory["cuda_peak"], cuda_peak)
+            stage.memory["rss_peak"] = max(stage.memory["rss_peak"], rss)
+
+        return rss
+
+    def enter(self, stage):
+        with self.lock:
+            rss = self.fold()
+            torch = self.cuda()
+            python = tracemalloc.get_traced_memory()[0]
+            cuda = torch.cuda.memory_allocated() if torch is not None else 0
+
+            stage.memory = {"rss": rss, "rss_peak": rss, "python": python, "python_peak": python, "cuda": cuda, "cuda_peak": cuda}
+            self.active.append(stage)
+
+    def exit(self, stage):
+        with self.lock:
+            self.fold()
+            self.active.remove(stage)
+            memory = stage.memory
+
+        return {"rss_peak_mb": memory["rss_peak"] / 1024**2, "rss_growth_mb": (memory["rss_peak"] - memory["rss"]) / 1024**2, "python_peak_mb": (memory["python_peak"] - memory["python"]) / 1024**2, "cuda_peak_mb": (memory["cuda_peak"] - memory["cuda"]) / 1024**2}
+
+    def sample(self):
+        while not self.stopped.wait(self.interval):
+            rss = current_rss()
+            if rss is None: return
+
+            with self.lock:
+                for stage in self.active:
+                    if rss > stage.memory["rss_peak"]: stage.memory["rss_peak"] = rss
+
+    def stop(self):
+        self.stopped.set()
+        if self.started_tracemalloc and tracemalloc.is_tracing(): tracemalloc.stop()
+
+class Tracer:
+    def __init__(self, output_dir="traces", memory=False, memory_limit_mb=None):
+        self.output_dir = output_dir
+        self.lock = threading.Lock()
+        self.memory = None
+        self.memory_limit_mb = None
+        if memory: self.profile_memory(memory_limit_mb)
+        self.reset()
+
+    def profile_memory(self, limit_mb=None):
+        if self.memory is None: self.memory = MemoryProfiler()
+
+        if limit_mb is None: limit_mb = float(os.environ.get("RVC_TRACE_MEMORY_LIMIT_MB", 0))
+        if not limit_mb and physical_memory(): limit_mb = 0.8 * physical_memory() / 1024**2
+        self.memory_limit_mb = limit_mb or None
+
+    def reset(self):
+        with self.lock:
+            self.origin = time.perf_counter()
+            self.events = []
+            self.stages = {}
+            self.peaks = {}
+            self.counters = {}
+
+    def stage(self, name, **args):
+        return Stage(self, name, args)
+
+    def add(self, name, start, end, args=None, usage=None):
+        with self.lock:
+            self.events.append({"name": name, "ph": "X", "ts": (start - self.origin) * 1e6, "dur": (end - start) * 1e6, "pid": os.getpid(), "tid": threading.get_ident(), "args": dict(args or {}, **(usage or {}))})
+            total, calls = self.stages.get(name, (0.0, 0))
+            self.stages[name] = (total + end - start, calls + 1)
+
+            if usage is not None:
+                peaks = self.peaks.setdefault(name, {})
+                for key, value in usage.items():
+                    peaks[key] = max(peaks.get(key, 0.0), value)
+
+                self.events.append({"name": "rss_mb", "ph": "C", "ts": (end - self.origin) * 1e6, "pid": os.getpid(), "args": {"rss_mb": usage["rss_peak_mb"]}})
+                audio_seconds = self.counters.get("audio_seconds")
+
+        if usage is not None and self.memory_limit_mb and usage["rss_peak_mb"] > self.memory_limit_mb: print(f"[WARNING] Stage '{name}' peaked at {usage['rss_peak_mb']:.0f} MB RSS (limit {self.memory_limit_mb:.0f} MB, +{usage['rss_growth_mb']:.0f} MB in stage) on {'unknown length' if audio_seconds is None else f'{audio_seconds:.1f}s of'} input audio" + (f" ({', '.join(f'{k}={v}' for k, v in args.items())})" if args else ""))
+
+    def count(self, name, value=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+            self.events.append({"name": name, "ph": "C", "ts": (time.perf_counter() - self.origin) * 1e6, "pid": os.getpid(), "args": {name: self.counters[name]}})
+
+    def summary(self, elapsed):
+        with self.lock:
+            audio_seconds = self.counters.get("audio_seconds", 0)
+            summary = {"elapsed": elapsed, "audio_seconds": audio_seconds, "rtf": elapsed / audio_seconds if audio_seconds else None, "stages": {name: dict({"seconds": total, "calls": calls}, **self.peaks.get(name, {})) for name, (total, calls) in sorted(self.stages.items(), key=lambda item: -item[1][0])}, "counters": dict(self.counters)}
+
+            if self.peaks: summary["memory"] = {"peak_stage": max(self.peaks, key=lambda name: (self.peaks[name]["rss_peak_mb"], self.peaks[name]["rss_growth_mb"])), "rss_peak_mb": max(peaks["rss_peak_mb"] for peaks in self.peaks.values()), "limit_mb": self.memory_limit_mb}
+            return summary
+
+    def write(self, name, elapsed):
+        summary = self.summary(elapsed)
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, f"{name}_{time.strftime('%Y%m%d_%H%M%S')}_{os.getpid()}.json")
+
+        with self.lock:
+            data = {"traceEvents": list(self.events), "displayTimeUnit": "ms", "summary": summary}
+
+        with open(path, "w") as f:
+            json.dump(data, f)
+
+        print(f"[INFO] Trace written to {path} (rtf {summary['rtf'] if summary['rtf'] is None else round(summary['rtf'], 3)})")
+        if "memory" in summary: print(f"[INFO] Peak RSS {summary['memory']['rss_peak_mb']:.0f} MB in stage '{summary['memory']['peak_stage']}'")
+        return path
+
+tracer = Tracer(os.environ.get("RVC_TRACE_DIR", "traces"), memory=os.environ.get("RVC_TRACE_MEMORY", "0") == "1") if os.environ.get("RVC_TRACE", "0") == "1" or os.environ.get("RVC_TRACE_MEMORY", "0") == "1" else None
+
+def enable(output_dir=None, memory=False, memory_limit_mb=None):
+    global tracer
+    if tracer is None: tracer = Tracer(output_dir or os.environ.get("RVC_TRACE_DIR", "traces"))
+    elif output_dir is not None: tracer.output_dir = output_dir
+
+    if memory: tracer.profile_memory(memory_limit_mb)
+    return tracer
+
+def disable():
+    global tracer
+    if tracer is not None and tracer.memory is not None: tracer.memory.stop()
+    tracer = None
+
+@contextlib.contextmanager
+def scoped():
+    global tracer
+    previous = tracer
+    state = None if previous is None else (previous.output_dir, previous.memory, previous.memory_limit_mb)
+
+    try:
+        yield
+    finally:
+        if tracer is not previous: disable()
+        tracer = previous
+
+        if previous is not None:
+            if previous.memory is not None and previous.memory is not state[1]: previous.memory.stop()
+            previous.output_dir, previous.memory, previous.memory_limit_mb = state
+
+def stage(name, **args):
+    return null if tracer is None else tracer.stage(name, **args)
+
+def count(name, value=1):
+    if tracer is not None: tracer.count(name, value)
+
+@contextlib.contextmanager
+def job(name):
+    if tracer is None:
+        yield None
+        return
+
+    tracer.reset()
+    start = time.perf_counter()
+
+    try:
+        yield tracer
+    finally:
+        tracer.write(name, time.perf_counter() - start)
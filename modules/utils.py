@@ -12,7 +12,8 @@ import torch.nn.functional as F
 
 sys.path.append(os.getcwd())
 
-from modules import opencl
+from modules import opencl, tracing
+from modules.cache import audio_cache, file_digest
 
 def change_rms(source_audio, source_rate, target_audio, target_rate, rate):
     rms2 = F.interpolate(torch.from_numpy(librosa.feature.rms(y=target_audio, frame_length=target_rate // 2 * 2, hop_length=target_rate // 2)).float().unsqueeze(0), size=target_audio.shape[0], mode="linear").squeeze()
@@ -25,6 +26,10 @@ def clear_gpu_cache():
     elif torch.backends.mps.is_available(): torch.mps.empty_cache()
     elif opencl.is_available(): opencl.pytorch_ocl.empty_cache()
 
+def module_bytes(module):
+    tensors = [t for value in module.state_dict().values() for t in (value if isinstance(value, tuple) else (value,)) if isinstance(t, torch.Tensor)]
+    return sum(t.numel() * t.element_size() for t in tensors)
+
 def HF_download_file(url, output_path=None):
     url = url.replace("/blob/", "/resolve/").replace("?download=true", "").strip()
     output_path = os.path.basename(url) if output_path is None else (os.path.join(output_path, os.path.basename(url)) if os.path.isdir(output_path) else output_path)
@@ -63,11 +68,23 @@ def check_embedders(hubert):
         if not os.path.exists(model_path): 
             HF_download_file("".join([codecs.decode("uggcf://uhttvatsnpr.pb/NauC/Ivrganzrfr-EIP-Cebwrpg/erfbyir/znva/rzorqqref/", "rot13"), "fairseq/", hubert]), model_path)
 
+def cached_audio(file, sample_rate=16000):
+    if not audio_cache.enabled: return None, None
+
+    key = audio_cache.key(file_digest(file), os.stat(file).st_mtime_ns, sample_rate, "soxr_vhq")
+    cached = audio_cache.get(key, mmap_mode="c")
+    if cached is not None: tracing.count("decode_cache_hits")
+
+    return key, cached
+
 def load_audio(file, sample_rate=16000):
     try:
         file = file.strip(" ").strip('"').strip("\n").strip('"').strip(" ")
         if not os.path.isfile(file): raise FileNotFoundError(f"[ERROR] Not found audio: {file}")
 
+        key, cached = cached_audio(file, sample_rate)
+        if cached is not None: return cached
+
         try:
             audio, sr = sf.read(file, dtype=np.float32)
         except:
@@ -77,8 +94,58 @@ def load_audio(file, sample_rate=16000):
         if sr != sample_rate: audio = librosa.resample(audio, orig_sr=sr, target_sr=sample_rate, res_type="soxr_vhq")
     except Exception as e:
         raise RuntimeError(f"[ERROR] Error reading audio file: {e}")
-    
-    return audio.flatten()
+
+    audio = np.ascontiguousarray(audio.flatten(), dtype=np.float32)
+    return audio_cache.put(key, audio) if key is not None else audio
+
+def open_audio(file):
+    file = file.strip(" ").strip('"').strip("\n").strip('"').strip(" ")
+    if not os.path.isfile(file): raise FileNotFoundError(f"[ERROR] Not found audio: {file}")
+
+    try:
+        return sf.SoundFile(file)
+    except Exception:
+        print(f"[WARNING] '{file}' cannot be decoded block-wise, falling back to a full in-memory decode.")
+        return None
+
+def audio_peak(file, block_size=262144):
+    f = open_audio(file)
+    if f is None: return float(np.abs(load_audio(file, 16000)).max())
+
+    peak = 0.0
+
+    with f:
+        for block in f.blocks(blocksize=block_size, dtype="float32", always_2d=True):
+            peak = max(peak, float(np.abs(block.mean(axis=1)).max()))
+
+    return peak
+
+def stream_audio(file, sample_rate=16000, block_size=65536):
+    file = file.strip(" ").strip('"').strip("\n").strip('"').strip(" ")
+    audio = cached_audio(file, sample_rate)[1] if os.path.isfile(file) else None
+    f = open_audio(file) if audio is None else None
+
+    if audio is not None or f is None:
+        if audio is None: audio = load_audio(file, sample_rate)
+
+        for start in range(0, audio.shape[0], block_size):
+            yield audio[start : start + block_size]
+
+        return
+
+    import soxr
+
+    with f:
+        resampler = soxr.ResampleStream(f.samplerate, sample_rate, 1, dtype="float32", quality="VHQ") if f.samplerate != sample_rate else None
+
+        for block in f.blocks(blocksize=block_size, dtype="float32", always_2d=True):
+            block = block.mean(axis=1)
+            if resampler is not None: block = resampler.resample_chunk(block)
+            if block.shape[0]: yield block
+
+        if resampler is not None:
+            block = resampler.resample_chunk(np.zeros(0, dtype=np.float32), last=True)
+            if block.shape[0]: yield block
 
 class Autotune:
     def __init__(self, ref_freqs):
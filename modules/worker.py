@@ -0,0 +1,161 @@
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import subprocess
+
+sys.path.append(os.getcwd())
+
+def serve(is_half=False, cpu_mode=False, backend="torch", quantize=None, compile_mode=None):
+    sys.stdout.flush()
+    protocol = os.fdopen(os.dup(sys.stdout.fileno()), "w", buffering=1)
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    start = time.perf_counter()
+
+    from modules import tracing
+    from modules.config import Config
+    from modules.inference import run_inference_script, VoiceConverter, model_registry
+
+    config = Config(is_half=is_half, cpu_mode=cpu_mode, backend=backend, quantize=quantize, compile_mode=compile_mode)
+    identity = {"is_half": is_half, "cpu_mode": cpu_mode, "backend": backend, "quantize": quantize, "compile_mode": compile_mode}
+    cvt = None
+
+    print(f"[INFO] Worker ready in {time.perf_counter() - start:.2f}s.")
+    protocol.write(json.dumps({"ready": True}) + "\n")
+    protocol.flush()
+
+    for line in sys.stdin:
+        if not line.strip(): continue
+
+        try:
+            job = json.loads(line)
+        except ValueError as e:
+            print(f"[ERROR] Invalid job: {e}")
+            continue
+
+        if job.get("op") == "shutdown": break
+
+        start = time.perf_counter()
+        response = {"id": job.get("id"), "ok": True}
+
+        try:
+            kwargs = job.get("kwargs", {})
+            mismatched = [name for name, value in identity.items() if kwargs.pop(name, value) != value]
+            if mismatched: raise ValueError(f"[ERROR] Job options {', '.join(mismatched)} do not match this worker, request one with get_worker.")
+
+            cold = not (kwargs.get("pth_path") and model_registry.is_loaded(kwargs["pth_path"], config))
+
+            if cvt is None and kwargs.get("pth_path") and os.path.isfile(kwargs["pth_path"]): cvt = VoiceConverter(config, kwargs["pth_path"], 0)
+            with tracing.scoped():
+                run_inference_script(is_half=config.is_half, cpu_mode=config.cpu_mode, backend=config.backend, quantize=config.quantize, compile_mode=config.compile_mode, cvt=cvt, **kwargs)
+        except Exception as e:
+            import traceback
+            print(traceback.format_exc())
+            response.update({"ok": False, "error": str(e)})
+            cold = True
+
+        response.update({"elapsed": time.perf_counter() - start, "cold": cold})
+        print(f"[INFO] Job {response['id']} finished in {response['elapsed']:.2f}s ({'cold' if cold else 'warm'}).")
+
+        sys.stdout.flush()
+        protocol.write(json.dumps(response) + "\n")
+        protocol.flush()
+
+class InferenceWorker:
+    def __init__(self, is_half=False, cpu_mode=False, backend="torch", quantize=None, compile_mode=None):
+        self.is_half = is_half
+        self.cpu_mode = cpu_mode
+        self.backend = backend
+        self.quantize = quantize
+        self.compile_mode = compile_mode
+        self.process = None
+        self.jobs = 0
+        self.lock = threading.Lock()
+
+    @property
+    def alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def start(self):
+        if self.alive: return
+
+        args = [sys.executable, "-m", "modules.worker"]
+        if self.is_half: args.append("--is_half")
+        if self.cpu_mode: args.append("--cpu_mode")
+        args += ["--backend", self.backend]
+        if self.quantize is not None: args += ["--quantize", self.quantize]
+        if self.compile_mode is not None: args += ["--compile_mode", self.compile_mode]
+
+        self.process = subprocess.Popen(args, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=os.getcwd(), text=True, bufsize=1)
+        threading.Thread(target=self.forward_logs, args=(self.process.stderr,), daemon=True).start()
+
+        if not self.read():
+            self.close()
+            raise RuntimeError("[ERROR] Inference worker exited during start-up.")
+
+    def forward_logs(self, stream):
+        for line in stream:
+            print(line, end="")
+
+    def read(self):
+        line = self.process.stdout.readline()
+        return json.loads(line) if line else None
+
+    def convert(self, **kwargs):
+        with self.lock:
+            start = time.perf_counter()
+            self.start()
+
+            self.jobs += 1
+            self.process.stdin.write(json.dumps({"id": self.jobs, "kwargs": kwargs}) + "\n")
+            self.process.stdin.flush()
+
+            response = self.read()
+            if response is None:
+                self.close()
+                raise RuntimeError("[ERROR] Inference worker exited unexpectedly.")
+
+            response["time_to_result"] = time.perf_counter() - start
+            print(f"[INFO] Time to first result: {response['time_to_result']:.2f}s ({'cold' if response['cold'] else 'warm'}).")
+
+            if not response["ok"]: raise RuntimeError(response.get("error"))
+            return response
+
+    def close(self):
+        if self.process is None: return
+
+        if self.alive:
+            try:
+                self.process.stdin.write(json.dumps({"op": "shutdown"}) + "\n")
+                self.process.stdin.flush()
+                self.process.wait(timeout=10)
+            except (OSError, subprocess.TimeoutExpired):
+                self.process.kill()
+
+        self.process = None
+
+worker = None
+
+def get_worker(is_half=False, cpu_mode=False, backend="torch", quantize=None, compile_mode=None):
+    global worker
+
+    if worker is not None and (worker.is_half, worker.cpu_mode, worker.backend, worker.quantize, worker.compile_mode) != (is_half, cpu_mode, backend, quantize, compile_mode):
+        worker.close()
+        worker = None
+
+    if worker is None: worker = InferenceWorker(is_half=is_half, cpu_mode=cpu_mode, backend=backend, quantize=quantize, compile_mode=compile_mode)
+    return worker
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--is_half", action="store_true")
+    parser.add_argument("--cpu_mode", action="store_true")
+    parser.add_argument("--backend", default="torch")
+    parser.add_argument("--quantize", default=None)
+    parser.add_argument("--compile_mode", default=None)
+    args = parser.parse_args()
+
+    serve(args.is_half, args.cpu_mode, args.backend, args.quantize, args.compile_mode)